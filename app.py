@@ -1,364 +1,60 @@
-from flask import Flask, render_template, request, jsonify
-import requests
-import json
-import re
-import os
+from flask import Flask, Response, request, jsonify, send_file
 from flask_cors import CORS
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
+import math
+import threading
 import time
-import pickle
+from settings import load_api_config, save_api_config
+import http_client
+import result_cache
+import batch
+from coalescer import SingleFlight
+import tracker
+import timeseries
+import live
+import jobs
+import guard
+import metrics
+import platforms
+import avatars
+import resolver
+from fetcher import fetch_and_record
+import assets
+import responses
+from logutil import setup_logging
 
 app = Flask(__name__)
 CORS(app)
+setup_logging()
+app.jinja_env.globals['asset_url'] = assets.asset_url
+app.after_request(responses.compress)
 
-# API 配置文件路径
-CONFIG_FILE = 'api_config.json'
-
-def load_api_config():
-    """加载 API 配置"""
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, 'r') as f:
-            return json.load(f)
-    return {'youtube': '', 'twitter': ''}
-
-def save_api_config(config):
-    """保存 API 配置"""
-    with open(CONFIG_FILE, 'w') as f:
-        json.dump(config, f)
-
-def get_bilibili_info(uid):
-    """
-    获取B站用户信息
-    :param uid: B站用户UID
-    :return: 用户信息
-    """
-    url = f"https://api.bilibili.com/x/web-interface/card?mid={uid}"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-        "Referer": "https://www.bilibili.com"
-    }
-    
-    try:
-        response = requests.get(url, headers=headers)
-        data = response.json()
-        print("API Response:", json.dumps(data, ensure_ascii=False, indent=2))  # 调试输出
-        
-        if data["code"] == 0 and "data" in data and "card" in data["data"]:
-            card = data["data"]["card"]
-            # 直接使用API返回的头像URL
-            return {
-                "success": True,
-                "username": card["name"],
-                "avatar": card["face"],  # 直接使用原始URL
-                "follower": card["fans"]
-            }
-        else:
-            error_msg = data.get("message", "获取用户信息失败")
-            print("Error:", error_msg)  # 调试输出
-            return {"success": False, "message": error_msg}
-    except Exception as e:
-        print("Exception:", str(e))  # 调试输出
-        return {"success": False, "message": str(e)}
-
-def get_youtube_info(channel_id):
-    """获取 YouTube 频道信息"""
-    config = load_api_config()
-    api_key = config.get('youtube')
-    
-    if not api_key:
-        return {
-            'success': False,
-            'message': '请先在配置页面设置 YouTube API 密钥'
-        }
-    
-    try:
-        url = f'https://www.googleapis.com/youtube/v3/channels'
-        params = {
-            'part': 'snippet,statistics',
-            'id': channel_id,
-            'key': api_key
-        }
-        response = requests.get(url, params=params)
-        data = response.json()
-        
-        if 'error' in data:
-            error_message = data['error'].get('message', '未知错误')
-            return {
-                'success': False,
-                'message': f'YouTube API 错误: {error_message}'
-            }
-        
-        if not data.get('items'):
-            return {
-                'success': False,
-                'message': '未找到该 YouTube 频道，请确保输入了正确的频道ID'
-            }
-        
-        channel = data['items'][0]
-        return {
-            'success': True,
-            'username': channel['snippet']['title'],
-            'avatar': channel['snippet']['thumbnails']['default']['url'],
-            'follower': int(channel['statistics']['subscriberCount'])
-        }
-    except Exception as e:
-        print(f"YouTube API Error: {str(e)}")  # 添加调试输出
-        return {
-            'success': False,
-            'message': f'获取 YouTube 信息失败: {str(e)}'
-        }
-
-def get_twitter_info(username):
-    """获取 Twitter 用户信息"""
-    config = load_api_config()
-    api_key = config.get('twitter')
-    
-    if not api_key:
-        return {
-            'success': False,
-            'message': '请先在配置页面设置 Twitter API 密钥'
-        }
-    
-    try:
-        url = f'https://api.twitter.com/2/users/by/username/{username}'
-        headers = {
-            'Authorization': f'Bearer {api_key}'
-        }
-        params = {
-            'user.fields': 'profile_image_url,public_metrics'
-        }
-        response = requests.get(url, headers=headers, params=params)
-        data = response.json()
-        
-        if 'errors' in data:
-            return {
-                'success': False,
-                'message': f'Twitter API 错误: {data["errors"][0]["message"]}'
-            }
-        
-        if not data.get('data'):
-            return {
-                'success': False,
-                'message': '未找到该 Twitter 用户'
-            }
-        
-        user = data['data']
-        return {
-            'success': True,
-            'data': {
-                'name': user['name'],
-                'avatar': user['profile_image_url'],
-                'fans': int(user['public_metrics']['followers_count'])
-            }
-        }
-    except Exception as e:
-        return {
-            'success': False,
-            'message': f'获取 Twitter 信息失败: {str(e)}'
-        }
-
-def get_telegram_channel_info(channel_name):
-    """爬取Telegram频道订阅数，兼容@和不同单位"""
-    # 自动去除@
-    channel_name = channel_name.lstrip('@')
-    url = f'https://t.me/s/{channel_name}'
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    try:
-        resp = requests.get(url, headers=headers, timeout=10)
-        if resp.status_code != 200:
-            return {'success': False, 'message': '无法访问频道页面'}
-        soup = BeautifulSoup(resp.text, 'html.parser')
-        # 频道名
-        title_tag = soup.find('meta', property='og:title')
-        channel_title = title_tag['content'] if title_tag else channel_name
-        # 订阅数
-        sub_text = soup.find('div', class_='tgme_page_extra')
-        if sub_text:
-            # 兼容 subscribers 和 members
-            match = re.search(r'(\d[\d,\.]*)\s+(subscribers|members)', sub_text.text)
-            if match:
-                count = match.group(1).replace(',', '').replace('.', '')
-                return {
-                    'success': True,
-                    'username': channel_title,
-                    'avatar': '/static/telegram.png',
-                    'follower': int(count)
-                }
-        return {'success': False, 'message': '未能解析订阅数，页面结构可能已变'}
-    except Exception as e:
-        return {'success': False, 'message': f'爬取失败: {str(e)}'}
-
-def get_telegram_group_info(group_name):
-    """爬取Telegram群组成员数"""
-    url = f'https://t.me/s/{group_name}'
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    try:
-        resp = requests.get(url, headers=headers, timeout=10)
-        if resp.status_code != 200:
-            return {'success': False, 'message': '无法访问群组页面'}
-        soup = BeautifulSoup(resp.text, 'html.parser')
-        title_tag = soup.find('meta', property='og:title')
-        group_title = title_tag['content'] if title_tag else group_name
-        extra = soup.find('div', class_='tgme_page_extra')
-        if extra:
-            match = re.search(r'(\d[\d,\.]*)\s+members', extra.text)
-            if match:
-                count = match.group(1).replace(',', '').replace('.', '')
-                return {
-                    'success': True,
-                    'username': group_title,
-                    'avatar': '/static/telegram.png',
-                    'follower': int(count)
-                }
-        return {'success': False, 'message': '未能解析成员数'}
-    except Exception as e:
-        return {'success': False, 'message': f'爬取失败: {str(e)}'}
-
-def get_xiaohongshu_info(user_id):
-    """爬取小红书用户粉丝数"""
-    url = f'https://www.xiaohongshu.com/user/{user_id}'
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    try:
-        resp = requests.get(url, headers=headers, timeout=10)
-        if resp.status_code != 200:
-            return {'success': False, 'message': '无法访问小红书主页'}
-        soup = BeautifulSoup(resp.text, 'html.parser')
-        # 用户名
-        title_tag = soup.find('title')
-        nickname = title_tag.text.split('的个人主页')[0] if title_tag else user_id
-        # 粉丝数（页面结构可能变化，需适配）
-        fans = None
-        for span in soup.find_all('span'):
-            if '粉丝' in span.text:
-                match = re.search(r'(\d[\d,\.]*)', span.text)
-                if match:
-                    fans = int(match.group(1).replace(',', '').replace('.', ''))
-                    break
-        if fans:
-            return {
-                'success': True,
-                'username': nickname,
-                'avatar': '/static/xiaohongshu.png',
-                'follower': fans
-            }
-        return {'success': False, 'message': '未能解析粉丝数'}
-    except Exception as e:
-        return {'success': False, 'message': f'爬取失败: {str(e)}'}
-
-def get_twitter_followers(username):
-    """获取推特用户粉丝数"""
-    try:
-        # 构建推特用户页面URL
-        url = f'https://twitter.com/{username}'
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        # 发送请求获取页面内容
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        # 使用BeautifulSoup解析页面
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # 查找包含粉丝数的元素
-        # 注意：由于推特页面结构可能会变化，这里需要根据实际情况调整选择器
-        followers_element = soup.find('a', href=re.compile(r'followers'))
-        if followers_element:
-            followers_text = followers_element.text.strip()
-            # 处理粉丝数格式（例如：1.2M, 100K等）
-            followers = parse_twitter_number(followers_text)
-            print(response.text[:1000])  # 打印前1000字符，检查返回内容
-            return followers
-        
-        return None
-    except Exception as e:
-        print(f"Error fetching Twitter followers: {str(e)}")
-        return None
-
-def parse_twitter_number(number_str):
-    """解析推特数字格式（如1.2M, 100K等）"""
-    try:
-        number_str = number_str.lower().replace(',', '')
-        if 'k' in number_str:
-            return int(float(number_str.replace('k', '')) * 1000)
-        elif 'm' in number_str:
-            return int(float(number_str.replace('m', '')) * 1000000)
-        else:
-            return int(number_str)
-    except:
-        return 0
-
-def save_cookies(driver, path):
-    with open(path, 'wb') as filehandler:
-        pickle.dump(driver.get_cookies(), filehandler)
-
-def load_cookies(driver, path):
-    if os.path.exists(path):
-        with open(path, 'rb') as cookiesfile:
-            cookies = pickle.load(cookiesfile)
-            for cookie in cookies:
-                driver.add_cookie(cookie)
-
-def get_douyin_fans(username):
-    url = f'https://www.douyin.com/user/{username}'
-    chrome_options = Options()
-    # chrome_options.add_argument('--headless')
-    chrome_options.add_argument('--disable-gpu')
-    chrome_options.add_argument('--no-sandbox')
-    chrome_options.add_argument('--window-size=1200,800')
-    chrome_options.add_argument('--lang=zh-CN')
-    driver = webdriver.Chrome(options=chrome_options)
-    driver.get('https://www.douyin.com/')  # 先访问主页以便加载cookie
-
-    # 尝试加载cookie
-    cookie_path = 'douyin_cookies.pkl'
-    try:
-        load_cookies(driver, cookie_path)
-        driver.refresh()
-        time.sleep(3)
-    except Exception as e:
-        print("未能加载cookie，需手动扫码登录", e)
-
-    # 如果未登录，手动扫码一次
-    if "登录" in driver.page_source or "扫码" in driver.page_source:
-        print("请扫码登录抖音...")
-        time.sleep(20)  # 给足扫码时间
-        save_cookies(driver, cookie_path)
-        print("已保存cookie，下次可自动登录")
-
-    driver.get(url)
-    time.sleep(5)
-    fans = None
-    try:
-        fans_elem = driver.find_element(By.XPATH, '//span[contains(text(),"粉丝")]/preceding-sibling::span')
-        fans = fans_elem.text
-    except Exception as e:
-        print("未能获取粉丝数，页面结构可能已变或需要登录。", e)
-    driver.quit()
-    return fans
+def send_page(name):
+    """页面在启动时预渲染，之后直接发送缓存的（压缩）字节"""
+    if app.debug:
+        assets.reload()
+    return responses.send_cached(name, assets.page(name), 'text/html', assets.PAGE_CACHE_CONTROL)
 
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return send_page('index.html')
 
 @app.route('/config')
 def config():
-    return render_template('config.html')
+    return send_page('config.html')
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    """带指纹的静态资源，内容变化时地址随之变化，可以永久缓存"""
+    found = assets.get(filename)
+    if found is None:
+        return jsonify({'success': False, 'error': 'Not found'}), 404
+    data, mimetype = found
+    return responses.send_cached(filename, data, mimetype, assets.IMMUTABLE)
 
 @app.route('/get_api_config')
 def get_api_config():
     """获取 API 配置"""
-    return jsonify(load_api_config())
+    return responses.conditional(jsonify(load_api_config()))
 
 @app.route('/save_api_config', methods=['POST'])
 def save_config():
@@ -366,6 +62,8 @@ def save_config():
     try:
         config = request.json
         save_api_config(config)
+        if 'http' in config:
+            http_client.reset_session()
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
@@ -374,78 +72,293 @@ def save_config():
 def check_api_status():
     """检查 API 状态"""
     config = load_api_config()
-    return jsonify({
+    return responses.conditional(jsonify({
         'youtube': bool(config.get('youtube')),
         'twitter': bool(config.get('twitter'))
-    })
+    }))
+
+def circuit_open_result(platform, identifier, failure=None):
+    """平台熔断或限速期间不请求上游：有旧值返回旧值，没有则立即失败"""
+    cached, fresh = result_cache.lookup(platform, identifier)
+    if cached is not None:
+        return dict(cached, stale=not fresh)
+    return failure or {'success': False, 'message': '平台暂时不可用，请稍后重试', 'circuit_open': True}
+
+def fetch_via_jobs(platform, identifier):
+    """慢平台交给后台进程池执行并等待结果，其余平台在当前线程直接请求"""
+    if jobs.is_slow(platform):
+        return jobs.run_and_wait(platform, identifier, fetch_and_record)
+    return fetch_and_record(platform, identifier)
+
+_inflight = SingleFlight()
+
+def lookup_followers(platform, identifier):
+    """
+    输入先解析为规范 ID，结果中的 identifier 即为该 ID；
+    已跟踪的账号直接返回调度器最近一次的采样；
+    其余走缓存查询，同一进程内相同账号的并发未命中只请求一次上游
+    """
+    try:
+        identifier = resolver.resolve(platform, identifier)
+    except resolver.Unresolved as e:
+        return e.result
+    sample = tracker.latest(platform, identifier)
+    if sample is None and guard.is_open(platform):
+        sample = circuit_open_result(platform, identifier)
+    if sample is None:
+        sample = result_cache.get_or_fetch(
+            platform, identifier,
+            lambda p, i: _inflight.do((p, i), fetch_via_jobs, p, i))
+    if sample.get('unavailable'):
+        sample = circuit_open_result(platform, identifier, sample)
+    return dict(sample, identifier=identifier)
 
 @app.route('/get_followers', methods=['POST'])
 def get_followers():
     platform = request.form.get('platform')
-    identifier = request.form.get('identifier')
+    identifier = (request.form.get('identifier') or '').strip()
     
     if not platform or not identifier:
         return jsonify({'success': False, 'error': 'Missing platform or identifier'})
+    if platforms.get(platform) is None:
+        return jsonify({'success': False, 'error': 'Unknown platform'}), 400
     
+    if jobs.is_slow(platform):
+        try:
+            identifier = resolver.resolve(platform, identifier)
+        except resolver.Unresolved as e:
+            return jsonify(e.result)
+        return slow_followers(platform, identifier)
+    result = lookup_followers(platform, identifier)
+    with metrics.timer('serialize', platform):
+        # 粉丝数没变时返回 304，前端沿用上次的结果
+        return responses.conditional(jsonify(avatars.for_client(result)))
+
+def slow_followers(platform, identifier):
+    """
+    慢平台不在 web worker 里等待：有采样或缓存时直接返回（过期的同时排队刷新），
+    否则入队并返回 202 和任务 ID，由 /jobs/<id> 获取结果
+    """
+    sample = tracker.latest(platform, identifier)
+    if sample is not None:
+        return responses.conditional(jsonify(avatars.for_client(dict(sample, identifier=identifier))))
+    if guard.is_open(platform):
+        result = circuit_open_result(platform, identifier)
+        return responses.conditional(jsonify(avatars.for_client(dict(result, identifier=identifier))))
+    cached, fresh = result_cache.lookup(platform, identifier)
+    if cached is not None:
+        if not fresh:
+            try:
+                jobs.submit(platform, identifier, fetch_and_record)
+            except jobs.QueueFull:
+                pass
+        return responses.conditional(jsonify(avatars.for_client(dict(cached, identifier=identifier))))
+    try:
+        job_id = jobs.submit(platform, identifier, fetch_and_record)
+    except jobs.QueueFull:
+        return jsonify({'success': False, 'message': '查询排队过多，请稍后重试'}), 503, {'Retry-After': '10'}
+    return jsonify({'pending': True, 'job_id': job_id, 'status_url': f'/jobs/{job_id}'}), 202
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """任务状态，?wait=秒 时长轮询直到任务结束"""
+    config = jobs.jobs_config()
     try:
-        if platform == 'bilibili':
-            # 现有的B站查询逻辑
-            result = get_bilibili_info(identifier)
-            if result['success']:
-                return jsonify({
-                    'success': True,
-                    'username': result['username'],
-                    'avatar': result['avatar'],
-                    'follower': result['follower']
-                })
-        elif platform == 'youtube':
-            result = get_youtube_info(identifier)
-            if result['success']:
-                return jsonify({
-                    'success': True,
-                    'username': result['username'],
-                    'avatar': result['avatar'],
-                    'follower': result['follower']
-                })
-        elif platform == 'wechat_mp':
-            result = {"success": False, "message": "公众号粉丝数查询暂未实现"}
-        elif platform == 'xiaohongshu':
-            result = get_xiaohongshu_info(identifier)
-        elif platform == 'douyin':
-            fans = get_douyin_fans(identifier)
-            if fans:
-                return jsonify({
-                    'success': True,
-                    'username': identifier,
-                    'avatar': f'https://p3.douyinpic.com/img/{identifier}~c5_300x300.jpg',
-                    'follower': fans
-                })
-            else:
-                return jsonify({'success': False, 'message': '抖音粉丝数获取失败'})
-        elif platform == 'kuaishou':
-            result = {"success": False, "message": "快手粉丝数查询暂未实现"}
-        elif platform == 'wechat_video':
-            result = {"success": False, "message": "视频号粉丝数查询暂未实现"}
-        elif platform == 'twitter':
-            # 新增的推特查询逻辑
-            followers = get_twitter_followers(identifier)
-            if followers is not None:
-                return jsonify({
-                    'success': True,
-                    'username': identifier,
-                    'follower': followers,
-                    'avatar': f'https://twitter.com/{identifier}/profile_image?size=original'
-                })
-        else:
-            return jsonify({"success": False, "message": "不支持的平台"})
-        
-        print(f"Platform: {platform}")
-        print(f"Identifier: {identifier}")
-        print(f"Result: {result}")
-        
-        return jsonify(result)
+        timeout = min(float(request.args.get('wait', 0)), config['max_wait'])
+    except ValueError:
+        timeout = 0
+    job = jobs.wait(job_id, timeout) if timeout > 0 else jobs.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': '任务不存在'}), 404
+    job['result'] = avatars.for_client(job['result'])
+    return jsonify(job)
+
+@app.route('/get_followers_batch', methods=['POST'])
+def get_followers_batch():
+    """批量查询，每完成一个就以 NDJSON（默认）或 SSE 推送一行结果"""
+    config = batch.batch_config()
+    try:
+        items = batch.parse_items(request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    if len(items) > config['max_items']:
+        return jsonify({'success': False, 'error': f'单次最多查询 {config["max_items"]} 个账号'}), 400
+    unknown = sorted({platform for platform, _ in items if platforms.get(platform) is None})
+    if unknown:
+        return jsonify({'success': False, 'error': f'不支持的平台: {", ".join(unknown)}'}), 400
+
+    if request.args.get('format') == 'sse':
+        def generate():
+            for index, platform, identifier, result in batch.run_batch(items, lookup_followers, config):
+                yield batch.format_sse(index, platform, identifier, avatars.for_client(result))
+            yield 'event: done\ndata: {}\n\n'
+        mimetype = 'text/event-stream'
+    else:
+        def generate():
+            for index, platform, identifier, result in batch.run_batch(items, lookup_followers, config):
+                yield batch.format_ndjson(index, platform, identifier, avatars.for_client(result))
+        mimetype = 'application/x-ndjson'
+    # X-Accel-Buffering 让 Nginx 不缓冲，结果能立即到达客户端
+    return Response(generate(), mimetype=mimetype, headers={'X-Accel-Buffering': 'no', 'Cache-Control': 'no-cache'})
+
+def is_trackable(platform):
+    """只有已实现的平台才能加入后台轮询，否则调度器会一直请求失败"""
+    entry = platforms.get(platform)
+    return entry is not None and entry.module is not None
+
+@app.route('/tracked', methods=['GET'])
+def list_tracked():
+    """已跟踪账号列表"""
+    items = tracker.list_tracked()
+    for item in items:
+        item['last_value'] = avatars.for_client(item['last_value'])
+    return jsonify({'success': True, 'items': items})
+
+@app.route('/tracked', methods=['POST'])
+def add_tracked():
+    """加入跟踪：{"platform": .., "identifier": .., "interval": 秒(可选)}"""
+    data = request.get_json(silent=True) or {}
+    platform = data.get('platform')
+    identifier = (data.get('identifier') or '').strip()
+    if not platform or not identifier:
+        return jsonify({'success': False, 'error': 'Missing platform or identifier'}), 400
+    if not is_trackable(platform):
+        return jsonify({'success': False, 'error': 'Unknown platform'}), 400
+    interval = data.get('interval')
+    if interval is not None:
+        try:
+            interval = float(interval)
+        except (TypeError, ValueError):
+            interval = None
+        if interval is None or not math.isfinite(interval):
+            return jsonify({'success': False, 'error': 'Invalid interval'}), 400
+    try:
+        identifier = resolver.resolve(platform, identifier)
+    except resolver.Unresolved as e:
+        return jsonify(e.result), 400
+    tracker.add(platform, identifier, interval)
+    return jsonify({'success': True, 'identifier': identifier})
+
+@app.route('/tracked', methods=['DELETE'])
+def remove_tracked():
+    """取消跟踪"""
+    data = request.get_json(silent=True) or {}
+    try:
+        identifier = resolver.resolve(data.get('platform'), data.get('identifier'))
+    except resolver.Unresolved as e:
+        return jsonify(e.result), 400
+    removed = tracker.remove(data.get('platform'), identifier)
+    return jsonify({'success': removed})
+
+@app.route('/live')
+def live_updates():
+    """
+    SSE 实时推送：/live?accounts=bilibili:2,youtube:UCxxx
+    先推送一次 snapshot，之后只在粉丝数变化时推送 update
+    """
+    hub = live.get_hub()
+    keys = []
+    for platform, identifier in live.parse_accounts(request.args.get('accounts'), hub.config['max_accounts']):
+        if not is_trackable(platform):
+            continue
+        try:
+            keys.append((platform, resolver.resolve(platform, identifier)))
+        except resolver.Unresolved:
+            pass
+    if not keys:
+        return jsonify({'success': False, 'error': 'Missing accounts'}), 400
+    return Response(hub.stream(keys), mimetype='text/event-stream',
+                    headers={'X-Accel-Buffering': 'no', 'Cache-Control': 'no-cache'})
+
+@app.route('/history')
+def history():
+    """
+    粉丝数历史：/history?platform=..&identifier=..&start=..&end=..&resolution=auto|raw|hour|day
+    start/end 为 Unix 时间戳，默认最近 30 天
+    """
+    platform = request.args.get('platform')
+    identifier = (request.args.get('identifier') or '').strip()
+    resolution = request.args.get('resolution', 'auto')
+    if not platform or not identifier:
+        return jsonify({'success': False, 'error': 'Missing platform or identifier'}), 400
+    if resolution not in ('auto', 'raw', 'hour', 'day'):
+        return jsonify({'success': False, 'error': 'resolution 只能是 auto/raw/hour/day'}), 400
+    try:
+        end = float(request.args.get('end') or time.time())
+        start = float(request.args.get('start') or end - 30 * 86400)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'start/end 必须是时间戳'}), 400
+    try:
+        identifier = resolver.resolve(platform, identifier)
+    except resolver.Unresolved as e:
+        return jsonify(e.result), 400
+    resolution, points = timeseries.query(platform, identifier, start, end, resolution)
+    return jsonify({'success': True, 'resolution': resolution, 'points': points})
+
+@app.route('/avatar')
+def avatar():
+    """头像代理：/avatar?url=上游地址&size=128，按内容哈希缓存在磁盘"""
+    url = request.args.get('url') or ''
+    try:
+        size = int(request.args.get('size') or 0)
+    except ValueError:
+        size = 0
+    config = avatars.avatar_config()
+    try:
+        path, content_type, etag = avatars.get(url, size, config)
+    except avatars.AvatarError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+        return jsonify({'success': False, 'error': str(e)}), 502
+    return send_file(path, mimetype=content_type, etag=etag, max_age=config['max_age'], conditional=True)
+
+@app.route('/platforms')
+def list_platforms():
+    """支持的平台及其能力（batchable/slow/needs_browser）"""
+    return responses.conditional(jsonify(platforms.describe()))
+
+@app.route('/platform_status')
+def platform_status():
+    """各平台熔断状态"""
+    return jsonify(guard.status())
+
+@app.route('/cache_stats')
+def cache_stats():
+    """缓存命中统计"""
+    return jsonify(result_cache.get_stats())
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus 文本格式的延迟直方图和计数，汇总所有 worker"""
+    stats = result_cache.get_stats()
+    gauges = {
+        'upmiao_cache_hit_ratio': ('结果缓存命中率（含过期后先返回旧值）', stats['hit_ratio']),
+        'upmiao_cache_entries': ('结果缓存条目数', stats['entries']),
+    }
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+_started = False
+_start_lock = threading.Lock()
+
+def start():
+    """
+    预渲染页面并启动后台调度，每个进程只执行一次
+    不在导入时执行：后台进程池的子进程、脚本导入 app 时都不应启动这些线程
+    """
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+        assets.prerender(app, ['index.html', 'config.html'])
+        tracker.start_scheduler(fetch_via_jobs)
+
+@app.before_request
+def ensure_started():
+    # gunicorn.conf.py 会在 worker 启动后调用 start()，这里兜底其他 WSGI 服务器
+    if not _started:
+        start()
 
 if __name__ == '__main__':
+    start()
     app.run(debug=True, port=5001) 
\ No newline at end of file
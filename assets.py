@@ -0,0 +1,78 @@
+import hashlib
+import mimetypes
+import os
+import threading
+
+from flask import render_template
+
+# 静态资源指纹与页面预渲染
+# static/ 下的文件按内容哈希生成 /assets/<名称>.<哈希>.<扩展名> 地址，内容变了地址就变，可以永久缓存；
+# 页面模板没有按请求变化的内容，启动时渲染一次，之后直接发送缓存的字节
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+ASSET_PREFIX = '/assets/'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+PAGE_CACHE_CONTROL = 'no-cache'   # 页面每次用 ETag 校验，资源地址更新后能立即生效
+
+_lock = threading.Lock()
+_manifest = None   # 逻辑路径 -> 带指纹的路径
+_files = {}        # 带指纹的路径 -> (内容, mimetype)
+_pages = {}
+
+
+def _build():
+    manifest, files = {}, {}
+    for root, _, names in os.walk(STATIC_DIR):
+        for name in names:
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, STATIC_DIR).replace(os.sep, '/')
+            with open(path, 'rb') as f:
+                data = f.read()
+            base, ext = os.path.splitext(rel)
+            hashed = f'{base}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+            manifest[rel] = hashed
+            files[hashed] = (data, mimetypes.guess_type(rel)[0] or 'application/octet-stream')
+    return manifest, files
+
+
+def manifest():
+    global _manifest, _files
+    if _manifest is None:
+        with _lock:
+            if _manifest is None:
+                _manifest, _files = _build()
+    return _manifest
+
+
+def asset_url(path):
+    """模板中使用：{{ asset_url('css/index.css') }}"""
+    hashed = manifest().get(path)
+    return ASSET_PREFIX + hashed if hashed else '/static/' + path
+
+
+def get(hashed):
+    """返回 (内容, mimetype)，不存在时返回 None"""
+    manifest()
+    return _files.get(hashed)
+
+
+def reload():
+    """调试模式下静态文件和模板可能随时修改，丢弃缓存"""
+    global _manifest
+    with _lock:
+        _manifest = None
+        _pages.clear()
+
+
+def page(name):
+    """返回预渲染的页面字节（需要在应用上下文中调用）"""
+    data = _pages.get(name)
+    if data is None:
+        data = _pages[name] = render_template(name).encode('utf-8')
+    return data
+
+
+def prerender(app, names):
+    with app.app_context():
+        for name in names:
+            page(name)
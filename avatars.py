@@ -0,0 +1,243 @@
+import hashlib
+import io
+import os
+import threading
+import time
+from urllib.parse import quote, urljoin, urlsplit
+
+import http_client
+import storage
+from coalescer import SingleFlight
+from logutil import get_logger
+from settings import load_api_config
+
+# 头像代理
+# 上游头像只下载一次，按内容哈希存到磁盘；缩放后的版本同样按 “哈希-尺寸” 存放，
+# 总大小超过上限时按最近访问时间淘汰。缩放依赖 Pillow（见 requirements.txt），未安装时直接返回原图
+
+DEFAULT_AVATAR_CONFIG = {
+    'enabled': True,
+    'dir': 'avatar_cache',
+    'max_bytes': 256 * 1024 * 1024,      # 磁盘缓存总大小上限
+    'max_source_bytes': 5 * 1024 * 1024, # 单张原图大小上限
+    'size': 128,                         # 卡片头像 64px，按 2 倍屏输出
+    'sizes': [64, 128, 256],             # 允许的输出尺寸，避免任意尺寸撑满缓存
+    'refresh': 7 * 86400,                # 同一 URL 多久后重新下载
+    'max_age': 7 * 86400,                # 浏览器缓存时间
+    # 只代理这些域名（及其子域名）的图片
+    'hosts': ['hdslb.com', 'douyinpic.com', 'ggpht.com', 'ytimg.com', 'googleusercontent.com',
+              'twimg.com', 'twitter.com', 'x.com', 'xhscdn.com', 'telesco.pe', 'cdn-telegram.org'],
+}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS avatar_source (
+    url TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS avatar_file (
+    name TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    content_type TEXT NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS avatar_file_lru ON avatar_file (last_access);
+'''
+
+ACCESS_TOUCH_INTERVAL = 60
+EVICT_EVERY = 50
+MAX_REDIRECTS = 3
+OUTPUT_FORMATS = {'JPEG': 'image/jpeg', 'PNG': 'image/png', 'WEBP': 'image/webp'}
+
+log = get_logger('avatars')
+
+_inflight = SingleFlight()
+_writes_lock = threading.Lock()
+_writes_since_evict = 0
+
+
+class AvatarError(Exception):
+    """头像无法代理：域名不在白名单、上游失败或不是图片"""
+
+
+def avatar_config():
+    config = dict(DEFAULT_AVATAR_CONFIG)
+    config.update(load_api_config().get('avatar') or {})
+    return config
+
+
+def _db():
+    storage.ensure_schema('avatars', SCHEMA)
+    return storage.connect()
+
+
+def is_allowed(url, config):
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    if parts.scheme not in ('http', 'https') or not host:
+        return False
+    return any(host == h or host.endswith('.' + h) for h in config['hosts'])
+
+
+def proxy_url(url, config=None):
+    """把上游头像地址换成 /avatar 代理地址；本地图片和不在白名单内的地址原样返回"""
+    if not url:
+        return url
+    config = config or avatar_config()
+    if not config['enabled'] or not is_allowed(url, config):
+        return url
+    return f"/avatar?url={quote(url, safe='')}&size={config['size']}"
+
+
+def for_client(result):
+    """返回给浏览器前把结果中的头像换成代理地址；缓存、历史和导出的结果保留上游原地址"""
+    if not result or not result.get('avatar'):
+        return result
+    return dict(result, avatar=proxy_url(result['avatar']))
+
+
+def _path(config, name):
+    return os.path.join(config['dir'], name[:2], name)
+
+
+def _write(config, name, data, content_type):
+    """先写临时文件再改名，多个进程同时写同一内容也不会读到半个文件"""
+    global _writes_since_evict
+    path = _path(config, name)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    _db().execute('INSERT OR REPLACE INTO avatar_file (name, size, content_type, last_access) '
+                  'VALUES (?, ?, ?, ?)', (name, len(data), content_type, time.time()))
+    with _writes_lock:
+        _writes_since_evict += 1
+        due = _writes_since_evict >= EVICT_EVERY
+        if due:
+            _writes_since_evict = 0
+    if due:
+        evict(config)
+
+
+def evict(config=None):
+    """按最近访问时间删除文件，直到总大小低于上限"""
+    config = config or avatar_config()
+    db = _db()
+    total = db.execute('SELECT COALESCE(SUM(size), 0) FROM avatar_file').fetchone()[0]
+    if total <= config['max_bytes']:
+        return
+    for row in db.execute('SELECT name, size FROM avatar_file ORDER BY last_access').fetchall():
+        if total <= config['max_bytes'] * 0.9:
+            break
+        try:
+            os.remove(_path(config, row['name']))
+        except FileNotFoundError:
+            pass
+        db.execute('DELETE FROM avatar_file WHERE name = ?', (row['name'],))
+        total -= row['size']
+
+
+def _lookup_file(config, name):
+    row = _db().execute('SELECT content_type, last_access FROM avatar_file WHERE name = ?',
+                        (name,)).fetchone()
+    if row is None or not os.path.exists(_path(config, name)):
+        return None
+    if time.time() - row['last_access'] > ACCESS_TOUCH_INTERVAL:
+        _db().execute('UPDATE avatar_file SET last_access = ? WHERE name = ?', (time.time(), name))
+    return row['content_type']
+
+
+def _open(url, config):
+    """手动跟随跳转，每一跳都检查白名单，防止被白名单内的地址跳转到任意主机"""
+    for _ in range(MAX_REDIRECTS + 1):
+        try:
+            resp = http_client.get(url, stream=True, allow_redirects=False)
+        except Exception as e:
+            raise AvatarError(f'下载失败: {e}')
+        if not resp.is_redirect:
+            return resp
+        resp.close()
+        url = urljoin(url, resp.headers['Location'])
+        if not is_allowed(url, config):
+            raise AvatarError('头像地址跳转到了不支持的域名')
+    raise AvatarError('跳转次数过多')
+
+
+def _download(url, config):
+    resp = _open(url, config)
+    with resp:
+        content_type = resp.headers.get('Content-Type', '').split(';')[0].strip()
+        if resp.status_code != 200 or not content_type.startswith('image/'):
+            raise AvatarError(f'上游返回 {resp.status_code} {content_type}')
+        data = bytearray()
+        for chunk in resp.iter_content(64 * 1024):
+            data.extend(chunk)
+            if len(data) > config['max_source_bytes']:
+                raise AvatarError('图片过大')
+    return bytes(data), content_type
+
+
+def _fetch_source(url, config):
+    """下载原图并返回内容哈希；相同 URL 的并发请求只下载一次"""
+    row = _db().execute('SELECT digest, fetched_at FROM avatar_source WHERE url = ?', (url,)).fetchone()
+    if (row is not None and time.time() - row['fetched_at'] < config['refresh']
+            and _lookup_file(config, row['digest']) is not None):
+        return row['digest']
+    data, content_type = _download(url, config)
+    digest = hashlib.sha256(data).hexdigest()
+    _write(config, digest, data, content_type)
+    _db().execute('INSERT OR REPLACE INTO avatar_source (url, digest, fetched_at) VALUES (?, ?, ?)',
+                  (url, digest, time.time()))
+    return digest
+
+
+def _resize(data, size):
+    """裁成正方形并缩小到 size，返回 (数据, Content-Type)；无法处理时返回 None"""
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            fmt = img.format if img.format in OUTPUT_FORMATS else 'PNG'
+            if min(img.size) <= size:
+                return None
+            img = ImageOps.fit(img, (size, size), Image.LANCZOS)
+            if fmt == 'JPEG' and img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+            out = io.BytesIO()
+            img.save(out, fmt, quality=85, optimize=True)
+            return out.getvalue(), OUTPUT_FORMATS[fmt]
+    except Exception as e:
+        log.info("头像缩放失败，返回原图 error=%s", e)
+        return None
+
+
+def _variant(config, digest, size):
+    name = f'{digest}-{size}'
+    content_type = _lookup_file(config, name)
+    if content_type is not None:
+        return name, content_type
+    with open(_path(config, digest), 'rb') as f:
+        resized = _resize(f.read(), size)
+    if resized is None:
+        # 原图已经足够小或无法缩放，直接用原图
+        return digest, _lookup_file(config, digest)
+    _write(config, name, *resized)
+    return name, resized[1]
+
+
+def get(url, size=None, config=None):
+    """
+    返回 (文件路径, Content-Type, ETag)
+    ETag 就是文件名（内容哈希），内容相同则 ETag 相同
+    """
+    config = config or avatar_config()
+    if not is_allowed(url, config):
+        raise AvatarError('不支持的头像地址')
+    size = size if size in config['sizes'] else config['size']
+    digest = _inflight.do(('source', url), _fetch_source, url, config)
+    name, content_type = _inflight.do(('variant', digest, size), _variant, config, digest, size)
+    return _path(config, name), content_type, name
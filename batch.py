@@ -0,0 +1,126 @@
+import json
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import platforms
+from settings import load_api_config
+
+# 各平台同时进行的查询数上限；未列出的平台按注册表中的能力决定：
+# 可合并的平台放开到一整批（并发的单个查询会合并成一次上游请求），需要浏览器的平台为 1
+DEFAULT_CONCURRENCY = {
+    'bilibili': 16,
+    'twitter': 4,
+    'telegram': 4,
+    'telegram_group': 4,
+    'xiaohongshu': 2,
+}
+DEFAULT_BATCH_CONFIG = {
+    'default_concurrency': 4,
+    'max_items': 500,
+}
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def batch_config():
+    config = dict(DEFAULT_BATCH_CONFIG)
+    config.update(load_api_config().get('batch') or {})
+    concurrency = dict(DEFAULT_CONCURRENCY)
+    concurrency.update(config.get('concurrency') or {})
+    config['concurrency'] = concurrency
+    return config
+
+
+def concurrency(platform, config):
+    """返回 (线程池键, 并发数)"""
+    if platform in config['concurrency']:
+        return platform, config['concurrency'][platform]
+    entry = platforms.get(platform)
+    if entry is not None and entry.batchable:
+        return platform, entry.max_batch
+    if entry is not None and entry.needs_browser:
+        return platform, 1
+    # 未知平台共用一个线程池，避免任意平台名不断创建新线程池
+    return '*', config['default_concurrency']
+
+
+def _executor(platform, config):
+    """每个平台一个独立线程池，慢平台排队不会占用快平台的线程"""
+    key, workers = concurrency(platform, config)
+    with _executors_lock:
+        executor = _executors.get(key)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch')
+            _executors[key] = executor
+        return executor
+
+
+def shutdown(cancel_futures=False):
+    """关闭所有平台线程池（命令行导出被中断时使用）；cancel_futures 时丢弃还没开始的查询"""
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=False, cancel_futures=cancel_futures)
+
+
+def parse_items(payload):
+    """
+    接受 {"items": [{"platform": .., "identifier": ..}, ...]}
+    或直接传 [[platform, identifier], ...]
+    """
+    items = payload.get('items') if isinstance(payload, dict) else payload
+    if not isinstance(items, list):
+        raise ValueError('items 必须是列表')
+    parsed = []
+    for item in items:
+        if isinstance(item, dict):
+            platform, identifier = item.get('platform'), item.get('identifier')
+        elif isinstance(item, (list, tuple)) and len(item) == 2:
+            platform, identifier = item
+        else:
+            raise ValueError(f'无法识别的查询项: {item!r}')
+        if not platform or not identifier:
+            raise ValueError('每一项都需要 platform 和 identifier')
+        parsed.append((str(platform), str(identifier).strip()))
+    return parsed
+
+
+def run_batch(items, lookup, config=None, max_pending=None, start=0):
+    """
+    并发执行查询，按完成顺序逐个产出 (序号, platform, identifier, 结果)
+    :param lookup: lookup(platform, identifier) -> 结果字典
+    :param max_pending: 同时提交的最大条数；指定后 items 可以是任意长度的迭代器，内存占用与输入长度无关
+    :param start: 第一项的序号
+    """
+    config = config or batch_config()
+    done = queue.Queue()
+    pending = 0
+
+    def task(index, platform, identifier):
+        try:
+            result = lookup(platform, identifier)
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        done.put((index, platform, identifier, result))
+
+    for index, (platform, identifier) in enumerate(items, start):
+        if max_pending is not None and pending >= max_pending:
+            yield done.get()
+            pending -= 1
+        _executor(platform, config).submit(task, index, platform, identifier)
+        pending += 1
+    for _ in range(pending):
+        yield done.get()
+
+
+def format_ndjson(index, platform, identifier, result):
+    row = {'index': index, 'platform': platform, 'identifier': identifier}
+    row.update(result)
+    return json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def format_sse(index, platform, identifier, result):
+    return f'event: result\ndata: {format_ndjson(index, platform, identifier, result)}\n'
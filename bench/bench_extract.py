@@ -0,0 +1,125 @@
+"""
+页面解析微基准：对比 BeautifulSoup 全量解析与 extract 的流式正则提取
+
+    python bench/bench_extract.py [-n 200]
+
+页面样本在 bench/fixtures 中，按真实页面的条数展开消息流/笔记列表
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import extract  # noqa: E402
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_page(name, item_name, marker, count):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        page = f.read()
+    with open(os.path.join(FIXTURES, item_name), encoding='utf-8') as f:
+        item = f.read()
+    items = ''.join(item.replace('{n}', str(n)) for n in range(count))
+    return page.replace(marker, items).encode('utf-8')
+
+
+class FakeResponse:
+    """模拟 stream=True 的响应，按块返回页面"""
+
+    encoding = 'utf-8'
+
+    def __init__(self, body):
+        self.body = body
+        self.read_bytes = 0
+
+    @property
+    def text(self):
+        self.read_bytes = len(self.body)
+        return self.body.decode(self.encoding)
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            chunk = self.body[i:i + chunk_size]
+            self.read_bytes += len(chunk)
+            yield chunk
+
+    def close(self):
+        pass
+
+
+def legacy_telegram(resp):
+    soup = BeautifulSoup(resp.text, 'html.parser')
+    title_tag = soup.find('meta', property='og:title')
+    title = title_tag['content'] if title_tag else None
+    counter = soup.find('span', class_='counter_value')
+    return title, extract.parse_count(counter.text) if counter else None
+
+
+def fast_telegram(resp):
+    return extract.extract_telegram(extract.read_until(resp, extract.telegram_done))
+
+
+def legacy_xiaohongshu(resp):
+    soup = BeautifulSoup(resp.text, 'html.parser')
+    title_tag = soup.find('title')
+    nickname = title_tag.text.split('的个人主页')[0].strip() if title_tag else None
+    # 粉丝数在 “粉丝” 标签前面的兄弟节点里
+    for label in soup.find_all('span', string='粉丝'):
+        count = label.find_previous_sibling('span')
+        if count is not None:
+            return nickname, extract.parse_count(count.text)
+    return nickname, None
+
+
+def fast_xiaohongshu(resp):
+    info = extract.extract_xiaohongshu(extract.read_until(resp, extract.xiaohongshu_done))
+    return info['nickname'], info['follower']
+
+
+def bench(label, fn, body, n):
+    resp = FakeResponse(body)
+    result = fn(resp)
+    read = resp.read_bytes
+    start = time.perf_counter()
+    for _ in range(n):
+        fn(FakeResponse(body))
+    per_call = (time.perf_counter() - start) / n * 1e6
+    print(f'  {label:<12} {per_call:>10.1f} µs/次  读取 {read / 1024:>7.1f} KiB  结果 {result}')
+    return per_call, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', type=int, default=200, help='每项重复次数')
+    args = parser.parse_args()
+
+    cases = [
+        ('telegram t.me/s/', load_page('telegram_channel.html', 'telegram_message.html', '<!--MESSAGES-->', 20),
+         legacy_telegram, fast_telegram),
+        ('xiaohongshu', load_page('xiaohongshu_user.html', 'xiaohongshu_note.html', '<!--NOTES-->', 30),
+         legacy_xiaohongshu, fast_xiaohongshu),
+    ]
+    for name, body, legacy, fast in cases:
+        print(f'{name}（页面 {len(body) / 1024:.1f} KiB）')
+        fast_us, fast_result = bench('extract', fast, body, args.n)
+        if BeautifulSoup is None:
+            print('  bs4          未安装，跳过对比')
+            continue
+        legacy_us, legacy_result = bench('bs4', legacy, body, args.n)
+        if legacy_result != fast_result:
+            # 两边没有解析出同样的结果时，耗时对比没有意义
+            print('  结果不一致，不计算提速')
+            continue
+        print(f'  提速 {legacy_us / fast_us:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
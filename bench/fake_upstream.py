@@ -0,0 +1,138 @@
+"""
+本地上游替身服务，返回录制格式的 B 站 / YouTube / Telegram / 小红书响应
+
+    python bench/fake_upstream.py --port 9100 --latency-ms 50 --jitter-ms 20 --error-rate 0.01
+
+应用以 UPMIAO_UPSTREAM_OVERRIDE=http://127.0.0.1:9100 启动后，
+https://api.bilibili.com/x/... 会被改写为 http://127.0.0.1:9100/api.bilibili.com/x/...
+"""
+import argparse
+import hashlib
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_extract import load_page  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def fake_count(key):
+    """同一个账号每次返回相同的粉丝数"""
+    return int(hashlib.md5(key.encode()).hexdigest()[:6], 16)
+
+
+class Upstream:
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, throttle_rate=0.0):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.bilibili = read_fixture('bilibili_card.json')
+        self.youtube = read_fixture('youtube_channel.json')
+        self.telegram = load_page('telegram_channel.html', 'telegram_message.html', '<!--MESSAGES-->', 20)
+        self.xiaohongshu = load_page('xiaohongshu_user.html', 'xiaohongshu_note.html', '<!--NOTES-->', 30)
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def handle(self, path, query):
+        """返回 (状态码, Content-Type, 响应体 bytes, 额外响应头)"""
+        with self._lock:
+            self.requests += 1
+        delay = max(0.0, random.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+        if delay:
+            time.sleep(delay)
+        roll = random.random()
+        if roll < self.throttle_rate:
+            return 429, 'application/json', b'{"code":-412,"message":"request was banned"}', {'Retry-After': '1'}
+        if roll < self.throttle_rate + self.error_rate:
+            return 503, 'text/plain', b'upstream error', {}
+
+        host, _, rest = path.lstrip('/').partition('/')
+        rest = '/' + rest
+        if host == 'api.bilibili.com' and rest.startswith('/x/web-interface/card'):
+            mid = query.get('mid', ['0'])[0]
+            body = self.bilibili.replace('{mid}', mid).replace('{fans}', str(fake_count(mid)))
+            return 200, 'application/json', body.encode(), {}
+        if host == 'api.bilibili.com' and rest.startswith('/x/relation/stat'):
+            vmid = query.get('vmid', ['0'])[0]
+            body = f'{{"code":0,"message":"0","ttl":1,"data":{{"mid":{vmid},"following":128,"whisper":0,"black":0,"follower":{fake_count(vmid)}}}}}'
+            return 200, 'application/json', body.encode(), {}
+        if host == 'www.googleapis.com' and rest.startswith('/youtube/v3/channels'):
+            ids = [i for i in query.get('id', [''])[0].split(',') if i]
+            items = ','.join(self.youtube.replace('{id}', i).replace('{subs}', str(fake_count(i)))
+                             for i in ids)
+            body = f'{{"kind":"youtube#channelListResponse","etag":"bench","pageInfo":{{"totalResults":{len(ids)},"resultsPerPage":{len(ids)}}},"items":[{items}]}}'
+            return 200, 'application/json', body.encode(), {}
+        if host == 't.me' and rest.startswith('/s/'):
+            return 200, 'text/html; charset=utf-8', self.telegram, {}
+        if host == 'www.xiaohongshu.com' and rest.startswith('/user/'):
+            return 200, 'text/html; charset=utf-8', self.xiaohongshu, {}
+        return 404, 'text/plain', b'not found', {}
+
+
+def make_handler(upstream):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            status, content_type, body, headers = upstream.handle(parts.path, parse_qs(parts.query))
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # 流式读取的客户端拿到所需字段后会提前断开，属于正常情况
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+
+def serve(port, upstream):
+    return Server(('127.0.0.1', port), make_handler(upstream))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=9100)
+    parser.add_argument('--latency-ms', type=float, default=0, help='平均响应延迟')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='延迟的标准差')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回 503 的比例')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='返回 429 的比例')
+    args = parser.parse_args()
+    upstream = Upstream(args.latency_ms, args.jitter_ms, args.error_rate, args.throttle_rate)
+    server = serve(args.port, upstream)
+    print(f'上游替身服务运行在 http://127.0.0.1:{args.port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+/get_followers 压测：启动本地上游替身和应用，按平台报告延迟分位数和吞吐
+
+    # 用 Flask 开发服务器
+    python bench/load.py --server flask --requests 500 --concurrency 16
+    # 用 gunicorn（需要已安装）
+    python bench/load.py --server gunicorn --workers 4 --threads 8
+    # 压已经在运行的实例（该实例需以 UPMIAO_UPSTREAM_OVERRIDE 指向替身服务）
+    python bench/load.py --server none --target http://127.0.0.1:8000
+
+默认每个请求使用不同的账号（全部未命中缓存），--distinct 10 则只在 10 个账号间循环，用于测缓存命中路径
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_upstream import Upstream, serve  # noqa: E402
+
+PLATFORMS = ['bilibili', 'youtube', 'telegram', 'xiaohongshu']
+
+IDENTIFIERS = {
+    'bilibili': lambda n: str(100000 + n),
+    'youtube': lambda n: f'UCbench{n:017d}',
+    'telegram': lambda n: f'bench_channel_{n}',
+    'xiaohongshu': lambda n: f'5a1b2c3d{n:016x}',
+}
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def write_config(path, platforms):
+    """压测用的配置：关闭后台轮询，放开限速，避免测到的是限速器"""
+    config = {
+        'youtube': 'bench-key',
+        'twitter': '',
+        'scheduler': {'enabled': False},
+        'limits': {p: {'rate': 1e6, 'burst': 1e6} for p in platforms},
+    }
+    with open(path, 'w') as f:
+        json.dump(config, f)
+
+
+def start_app(args, workdir, upstream_url):
+    env = dict(os.environ)
+    env.update({
+        'UPMIAO_CONFIG': os.path.join(workdir, 'api_config.json'),
+        'UPMIAO_DB': os.path.join(workdir, 'upmiao.db'),
+        'UPMIAO_UPSTREAM_OVERRIDE': upstream_url,
+    })
+    bind = f'127.0.0.1:{args.port}'
+    if args.server == 'flask':
+        cmd = [sys.executable, '-c',
+               f'import app; app.start(); app.app.run(host="127.0.0.1", port={args.port}, threaded=True)']
+    else:
+        gunicorn = shutil.which('gunicorn')
+        if gunicorn is None:
+            sys.exit('未找到 gunicorn，请先 pip install gunicorn')
+        cmd = [gunicorn, '-w', str(args.workers), '-k', 'gthread', '--threads', str(args.threads),
+               '-b', bind, 'app:app']
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    target = f'http://{bind}'
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            sys.exit('应用启动失败:\n' + proc.stderr.read().decode(errors='replace'))
+        try:
+            requests.get(target + '/cache_stats', timeout=1)
+            return proc, target
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.terminate()
+    sys.exit('应用 30 秒内未就绪')
+
+
+def run_platform(target, platform, total, concurrency, distinct):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=concurrency)
+    session.mount('http://', adapter)
+    make_id = IDENTIFIERS[platform]
+    offset = int(time.time() * 1000) % 1000000  # 每轮换一批账号，避免命中上一轮的缓存
+
+    def one(i):
+        identifier = make_id(offset + (i % distinct if distinct else i))
+        start = time.perf_counter()
+        try:
+            resp = session.post(f'{target}/get_followers',
+                                data={'platform': platform, 'identifier': identifier}, timeout=60)
+            ok = resp.status_code == 200 and resp.json().get('success') is True
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(r[0] * 1000 for r in results)
+    return {
+        'platform': platform,
+        'requests': total,
+        'errors': sum(1 for r in results if not r[1]),
+        'rps': total / elapsed if elapsed else 0,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', choices=['flask', 'gunicorn', 'none'], default='flask')
+    parser.add_argument('--target', help='--server none 时压测的地址')
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--upstream-port', type=int, default=9100)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--platforms', default=','.join(PLATFORMS))
+    parser.add_argument('--requests', type=int, default=300, help='每个平台的请求数')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--distinct', type=int, default=0, help='账号数，0 表示每个请求都不同')
+    parser.add_argument('--latency-ms', type=float, default=30)
+    parser.add_argument('--jitter-ms', type=float, default=10)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出结果，便于保存基线')
+    args = parser.parse_args()
+
+    platforms = [p for p in args.platforms.split(',') if p]
+    unknown = set(platforms) - set(IDENTIFIERS)
+    if unknown:
+        sys.exit(f'不支持的平台: {", ".join(sorted(unknown))}')
+
+    proc = server = None
+    workdir = tempfile.mkdtemp(prefix='upmiao-bench-')
+    try:
+        if args.server == 'none':
+            if not args.target:
+                sys.exit('--server none 需要同时指定 --target')
+            target = args.target.rstrip('/')
+        else:
+            upstream = Upstream(args.latency_ms, args.jitter_ms, args.error_rate, args.throttle_rate)
+            server = serve(args.upstream_port, upstream)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            write_config(os.path.join(workdir, 'api_config.json'), platforms)
+            proc, target = start_app(args, workdir, f'http://127.0.0.1:{args.upstream_port}')
+
+        rows = [run_platform(target, p, args.requests, args.concurrency, args.distinct) for p in platforms]
+        if args.json:
+            print(json.dumps({'server': args.server, 'concurrency': args.concurrency, 'results': rows},
+                             ensure_ascii=False, indent=2))
+        else:
+            print(f'服务器: {args.server}  并发: {args.concurrency}  上游延迟: {args.latency_ms}±{args.jitter_ms} ms')
+            print(f'{"平台":<12}{"请求":>8}{"失败":>8}{"req/s":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}')
+            for r in rows:
+                print(f'{r["platform"]:<12}{r["requests"]:>8}{r["errors"]:>8}{r["rps"]:>10.1f}'
+                      f'{r["p50"]:>10.1f}{r["p95"]:>10.1f}{r["p99"]:>10.1f}')
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+        if server is not None:
+            server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
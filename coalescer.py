@@ -0,0 +1,95 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """相同 key 的并发调用只执行一次，其余调用方等待并共享结果"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+        if not leader:
+            return future.result()
+        try:
+            result = fn(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+class MicroBatcher:
+    """
+    把短时间窗口内到达的单个查询合并成一次批量请求
+    :param fetch_many: fetch_many(keys) -> {key: 结果}，缺失的 key 交给 missing 处理
+    :param window: 收集窗口（秒）
+    :param max_batch: 单批上限，攒满立即发出
+    """
+
+    def __init__(self, fetch_many, window=0.01, max_batch=50, missing=None):
+        self.fetch_many = fetch_many
+        self.window = window
+        self.max_batch = max_batch
+        self.missing = missing
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._timer = None
+
+    def get(self, key, timeout=None):
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                future = Future()
+                self._pending[key] = future
+            if len(self._pending) >= self.max_batch:
+                batch = self._take()
+            else:
+                batch = None
+                if self._timer is None:
+                    self._timer = threading.Timer(self.window, self._flush_timer)
+                    self._timer.daemon = True
+                    self._timer.start()
+        if batch:
+            self._run(batch)
+        return future.result(timeout=timeout)
+
+    def _take(self):
+        batch, self._pending = self._pending, {}
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _flush_timer(self):
+        with self._lock:
+            self._timer = None
+            batch, self._pending = self._pending, {}
+        if batch:
+            self._run(batch)
+
+    def _run(self, batch):
+        try:
+            results = self.fetch_many(list(batch))
+        except Exception as e:
+            for future in batch.values():
+                future.set_exception(e)
+            return
+        for key, future in batch.items():
+            if key in results:
+                future.set_result(results[key])
+            elif self.missing is not None:
+                future.set_result(self.missing(key))
+            else:
+                future.set_exception(KeyError(key))
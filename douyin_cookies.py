@@ -0,0 +1,38 @@
+import os
+import pickle
+import threading
+
+from logutil import get_logger
+
+# 抖音登录 cookie 的读写，不依赖 selenium，轻量 HTTP 请求和浏览器池共用
+
+COOKIE_PATH = 'douyin_cookies.pkl'
+
+log = get_logger('douyin')
+
+
+class CookieJar:
+    """进程内共享的抖音 cookie，只在首次使用和登录后读写磁盘"""
+
+    def __init__(self, path=COOKIE_PATH):
+        self.path = path
+        self._cookies = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._cookies is None:
+                self._cookies = []
+                if os.path.exists(self.path):
+                    try:
+                        with open(self.path, 'rb') as f:
+                            self._cookies = pickle.load(f)
+                    except Exception as e:
+                        log.warning("未能加载cookie，需手动扫码登录 error=%s", e)
+            return list(self._cookies)
+
+    def update(self, cookies):
+        with self._lock:
+            self._cookies = list(cookies)
+            with open(self.path, 'wb') as f:
+                pickle.dump(self._cookies, f)
@@ -0,0 +1,240 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from douyin_cookies import CookieJar
+from logutil import get_logger
+
+HOME_URL = 'https://www.douyin.com/'
+
+log = get_logger('douyin')
+
+# 池大小、回收阈值等默认值，可在 api_config.json 的 douyin_pool 节中覆盖
+DEFAULT_POOL_CONFIG = {
+    'size': 2,              # 同时存活的浏览器数量上限
+    'max_pages': 200,       # 单个浏览器最多打开多少个页面后回收
+    'max_heap_mb': 512,     # JS 堆超过该值后回收
+    'page_timeout': 15,     # 等待粉丝数元素出现的秒数
+    'login_timeout': 60,    # 首次扫码登录的等待秒数
+    'checkout_timeout': 30, # 等待空闲浏览器的秒数
+    'headless': True,
+}
+
+FANS_XPATH = '//span[contains(text(),"粉丝")]/preceding-sibling::span'
+
+
+class PooledDriver:
+    """池中的一个浏览器实例及其使用统计"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.created_at = time.time()
+
+    def is_healthy(self):
+        try:
+            # 会话失效时访问 window_handles 会直接抛异常
+            return bool(self.driver.window_handles)
+        except WebDriverException:
+            return False
+
+    def heap_mb(self):
+        try:
+            used = self.driver.execute_script(
+                'return performance.memory ? performance.memory.usedJSHeapSize : 0')
+            return (used or 0) / (1024 * 1024)
+        except WebDriverException:
+            return 0
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+
+class DriverPool:
+    """
+    有界的常驻 Chrome 池
+    浏览器启动后先登录一次，之后每次查询只需一次页面跳转
+    """
+
+    def __init__(self, config=None, cookie_jar=None):
+        self.config = dict(DEFAULT_POOL_CONFIG)
+        self.config.update(config or {})
+        self.cookie_jar = cookie_jar or CookieJar()
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+
+    def _new_options(self):
+        chrome_options = Options()
+        if self.config['headless']:
+            chrome_options.add_argument('--headless=new')
+        chrome_options.add_argument('--disable-gpu')
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+        chrome_options.add_argument('--window-size=1200,800')
+        chrome_options.add_argument('--lang=zh-CN')
+        chrome_options.add_argument('--enable-precise-memory-info')
+        return chrome_options
+
+    def _needs_login(self, driver):
+        source = driver.page_source
+        return "登录" in source or "扫码" in source
+
+    def _start(self):
+        driver = webdriver.Chrome(options=self._new_options())
+        try:
+            driver.get(HOME_URL)  # 先访问主页以便加载cookie
+            for cookie in self.cookie_jar.get():
+                try:
+                    driver.add_cookie(cookie)
+                except WebDriverException:
+                    pass
+            driver.refresh()
+            WebDriverWait(driver, self.config['page_timeout']).until(
+                lambda d: d.execute_script('return document.readyState') == 'complete')
+
+            if self._needs_login(driver):
+                if self.config['headless']:
+                    # 无头模式下没人能看到二维码，等待只会耗尽查询时限
+                    log.warning("抖音未登录，继续以未登录状态查询；请运行 python douyin_pool.py login 扫码登录")
+                else:
+                    self.wait_for_login(driver, self.config['login_timeout'])
+        except Exception:
+            driver.quit()
+            raise
+        return PooledDriver(driver)
+
+    def wait_for_login(self, driver, timeout):
+        """等待扫码登录，成功后写入共享 cookie"""
+        log.warning("请扫码登录抖音...")
+        try:
+            WebDriverWait(driver, timeout).until(lambda d: not self._needs_login(d))
+        except TimeoutException:
+            log.warning("扫码登录超时，继续以未登录状态查询")
+            return False
+        self.cookie_jar.update(driver.get_cookies())
+        log.info("已保存cookie，下次可自动登录")
+        return True
+
+    def login(self, timeout):
+        """打开有界面的浏览器供扫码登录，cookie 保存后无头浏览器池即可直接使用"""
+        self.config['headless'] = False
+        driver = webdriver.Chrome(options=self._new_options())
+        try:
+            driver.get(HOME_URL)
+            WebDriverWait(driver, self.config['page_timeout']).until(
+                lambda d: d.execute_script('return document.readyState') == 'complete')
+            return not self._needs_login(driver) or self.wait_for_login(driver, timeout)
+        finally:
+            driver.quit()
+
+    def _should_recycle(self, item):
+        if item.pages >= self.config['max_pages']:
+            return True
+        if item.heap_mb() >= self.config['max_heap_mb']:
+            return True
+        return not item.is_healthy()
+
+    def _discard(self, item):
+        item.quit()
+        with self._lock:
+            self._created -= 1
+
+    def checkout(self):
+        """取出一个健康的浏览器，池满时阻塞等待"""
+        deadline = time.time() + self.config['checkout_timeout']
+        while True:
+            try:
+                item = self._idle.get_nowait()
+            except queue.Empty:
+                item = None
+                with self._lock:
+                    can_create = self._created < self.config['size']
+                    if can_create:
+                        self._created += 1
+                if can_create:
+                    try:
+                        return self._start()
+                    except Exception:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise TimeoutError('抖音浏览器池已满，等待超时')
+                try:
+                    item = self._idle.get(timeout=remaining)
+                except queue.Empty:
+                    raise TimeoutError('抖音浏览器池已满，等待超时')
+            if item.is_healthy():
+                return item
+            self._discard(item)
+
+    def checkin(self, item, broken=False):
+        """归还浏览器，超出页面数或内存阈值的直接回收"""
+        if broken or self._should_recycle(item):
+            self._discard(item)
+        else:
+            self._idle.put(item)
+
+    @contextmanager
+    def driver(self):
+        item = self.checkout()
+        broken = False
+        try:
+            yield item
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            self.checkin(item, broken=broken)
+
+    def close(self):
+        while True:
+            try:
+                item = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(item)
+
+    def fetch_page(self, username):
+        """
+        打开用户主页并等待粉丝数元素出现
+        返回 (粉丝数文本, 页面源码)，粉丝数元素未出现时文本为 None
+        """
+        url = f'https://www.douyin.com/user/{username}'
+        with self.driver() as item:
+            item.pages += 1
+            item.driver.get(url)
+            try:
+                fans_elem = WebDriverWait(item.driver, self.config['page_timeout']).until(
+                    EC.visibility_of_element_located((By.XPATH, FANS_XPATH)))
+                return fans_elem.text, item.driver.page_source
+            except TimeoutException as e:
+                log.warning("未能获取粉丝数，页面结构可能已变或需要登录 username=%s error=%s", username, e)
+                return None, item.driver.page_source
+
+
+if __name__ == '__main__':
+    # python douyin_pool.py login [等待秒数]：在有图形界面的机器上扫码登录，保存 cookie
+    import sys
+
+    from logutil import setup_logging
+    from settings import load_api_config
+
+    setup_logging()
+    if sys.argv[1:2] != ['login']:
+        sys.exit('用法: python douyin_pool.py login [等待秒数]')
+    timeout = float(sys.argv[2]) if len(sys.argv) > 2 else 300
+    sys.exit(0 if DriverPool(load_api_config().get('douyin_pool')).login(timeout) else 1)
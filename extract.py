@@ -0,0 +1,217 @@
+import codecs
+import html
+import json
+import re
+from urllib.parse import unquote
+
+# 页面数据提取
+# 只用正则定位需要的几个字段，不构建完整 DOM；配合流式读取，拿到字段后立即停止下载
+
+CHUNK_SIZE = 16 * 1024
+MAX_PAGE_SIZE = 4 * 1024 * 1024
+
+UNITS = {
+    'k': 1e3, '千': 1e3,
+    'm': 1e6,
+    'b': 1e9,
+    'w': 1e4, '万': 1e4,
+    '亿': 1e8,
+}
+
+# 数字之间允许千分位逗号或空格；单位后不能紧跟字母，避免把 "5 members" 的 m 当成百万
+# 出现两个以上的点（1.234.567）时点是千分位分隔符
+COUNT_RE = re.compile(r'(\d(?:[\d,]|\s(?=\d))*(?:\.\d+)*)\s*([kKmMbBwW千万亿]?)(?![a-zA-Z])')
+
+
+def parse_count(text):
+    """
+    解析 1,234 / 1.234.567 / 1.2K / 3.4M / 1.2万 / 3亿 这类数字，无法解析时返回 None
+    """
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return int(text)
+    match = COUNT_RE.search(str(text))
+    if not match:
+        return None
+    digits = re.sub(r'[,\s]', '', match.group(1))
+    if digits.count('.') > 1:
+        digits = digits.replace('.', '')
+    number = float(digits)
+    unit = match.group(2).lower()
+    return int(round(number * UNITS.get(unit, 1)))
+
+
+def read_until(resp, is_done, chunk_size=CHUNK_SIZE, limit=MAX_PAGE_SIZE):
+    """
+    流式读取响应，is_done(已读文本) 返回 True 时立即停止
+    需要配合 stream=True 的请求使用
+    """
+    decoder = codecs.getincrementaldecoder(resp.encoding or 'utf-8')(errors='replace')
+    text = ''
+    try:
+        for chunk in resp.iter_content(chunk_size):
+            text += decoder.decode(chunk)
+            if is_done(text) or len(text) > limit:
+                break
+        else:
+            text += decoder.decode(b'', final=True)
+    finally:
+        resp.close()
+    return text
+
+
+# Telegram
+
+OG_TITLE_RE = re.compile(r'<meta\s+property="og:title"\s+content="([^"]*)"')
+PAGE_EXTRA_RE = re.compile(r'<div class="tgme_page_extra">(.*?)</div>', re.S)
+# t.me/s/ 页面头部的计数器
+COUNTER_RE = re.compile(
+    r'<span class="counter_value">([^<]+)</span>\s*<span class="counter_type">(subscribers?|members?)</span>')
+TAG_RE = re.compile(r'<[^>]+>')
+TELEGRAM_COUNT_RE = re.compile(r'([\d][\d,.\s]*[KMB]?)\s+(subscribers?|members?)', re.I)
+
+
+def extract_telegram(text, kinds=('subscriber', 'member')):
+    """
+    返回 (标题, 人数)，未找到的字段为 None
+    :param kinds: 接受的计数类型，频道为订阅数和成员数，群组只接受成员数
+    """
+    title_match = OG_TITLE_RE.search(text)
+    title = html.unescape(title_match.group(1)) if title_match else None
+
+    count = None
+    extra = PAGE_EXTRA_RE.search(text)
+    if extra:
+        match = TELEGRAM_COUNT_RE.search(html.unescape(TAG_RE.sub(' ', extra.group(1))))
+        if match and match.group(2).lower().rstrip('s') in kinds:
+            count = parse_count(match.group(1))
+    if count is None:
+        for value, kind in COUNTER_RE.findall(text):
+            if kind.rstrip('s') in kinds:
+                count = parse_count(value)
+                break
+    return title, count
+
+
+def telegram_done(text, kinds=('subscriber', 'member')):
+    title, count = extract_telegram(text, kinds)
+    return title is not None and count is not None
+
+
+# 小红书
+
+INITIAL_STATE_RE = re.compile(r'window\.__INITIAL_STATE__\s*=\s*(\{.*?\})\s*</script>', re.S)
+UNDEFINED_RE = re.compile(r'(?<=[:\[,])\s*undefined\b')
+TITLE_RE = re.compile(r'<title>([^<]*)</title>')
+FANS_NEAR_RE = re.compile(r'>\s*([\d][\d,.]*\s*[万千亿wWkK]?)\s*</span>\s*<span[^>]*>\s*粉丝')
+
+
+def xiaohongshu_done(text):
+    start = text.find('window.__INITIAL_STATE__')
+    return start != -1 and text.find('</script>', start) != -1
+
+
+def extract_xiaohongshu(text):
+    """
+    优先读取页面内嵌的 __INITIAL_STATE__，失败时退回到 HTML 片段匹配
+    返回 {'nickname', 'avatar', 'follower'}，缺失的字段为 None
+    """
+    info = {'nickname': None, 'avatar': None, 'follower': None}
+    match = INITIAL_STATE_RE.search(text)
+    if match:
+        try:
+            # __INITIAL_STATE__ 是 JS 对象字面量，其中的 undefined 不是合法 JSON
+            state = json.loads(UNDEFINED_RE.sub('null', match.group(1)))
+            page = state.get('user', {}).get('userPageData', {}) or {}
+            basic = page.get('basicInfo') or {}
+            info['nickname'] = basic.get('nickname')
+            info['avatar'] = basic.get('imageb') or basic.get('images')
+            for item in page.get('interactions') or []:
+                if item.get('type') == 'fans' or item.get('name') == '粉丝':
+                    info['follower'] = parse_count(item.get('count'))
+                    break
+        except (ValueError, AttributeError):
+            pass
+    if info['follower'] is None:
+        fans = FANS_NEAR_RE.search(text)
+        if fans:
+            info['follower'] = parse_count(fans.group(1))
+    if info['nickname'] is None:
+        title = TITLE_RE.search(text)
+        if title:
+            info['nickname'] = html.unescape(title.group(1)).split('的个人主页')[0].strip() or None
+    return info
+
+
+# 抖音
+
+RENDER_DATA_RE = re.compile(r'<script id="RENDER_DATA" type="application/json">([^<]+)</script>')
+DOUYIN_FIELD_RES = {
+    'follower': re.compile(r'\\?"(?:followerCount|follower_count|mplatformFollowersCount)\\?":\s*(\d+)'),
+    'nickname': re.compile(r'\\?"nickname\\?":\s*\\?"((?:[^"\\]|\\u[0-9a-fA-F]{4})*)\\?"'),
+    'avatar': re.compile(r'\\?"(?:avatar300Url|avatarUrl)\\?":\s*\\?"((?:https?:)?(?:[^"\\]|\\u[0-9a-fA-F]{4}|\\/)+)\\?"'),
+}
+
+
+def _find_douyin_user(node, depth=0):
+    """在 RENDER_DATA 中找到带粉丝数的用户对象，字段路径经常变，按特征查找"""
+    if depth > 8:
+        return None
+    if isinstance(node, dict):
+        if 'followerCount' in node or 'follower_count' in node:
+            return node
+        children = node.values()
+    elif isinstance(node, list):
+        children = node
+    else:
+        return None
+    for child in children:
+        found = _find_douyin_user(child, depth + 1)
+        if found is not None:
+            return found
+    return None
+
+
+def _douyin_avatar(user):
+    for key in ('avatar300Url', 'avatarUrl', 'avatarThumb'):
+        value = user.get(key)
+        if isinstance(value, str) and value:
+            return value
+    for key in ('avatar_300x300', 'avatar_larger', 'avatar_medium', 'avatar_thumb'):
+        urls = (user.get(key) or {}).get('url_list') or []
+        if urls:
+            return urls[0]
+    return None
+
+
+def extract_douyin(text):
+    """
+    从服务端渲染的 RENDER_DATA 读取昵称、头像和粉丝数，
+    新版页面没有 RENDER_DATA 时按字段名在脚本里匹配
+    返回 {'nickname', 'avatar', 'follower'}，缺失的字段为 None
+    """
+    info = {'nickname': None, 'avatar': None, 'follower': None}
+    match = RENDER_DATA_RE.search(text)
+    if match:
+        try:
+            user = _find_douyin_user(json.loads(unquote(match.group(1))))
+        except ValueError:
+            user = None
+        if user is not None:
+            info['nickname'] = user.get('nickname')
+            info['avatar'] = _douyin_avatar(user)
+            info['follower'] = parse_count(user.get('followerCount', user.get('follower_count')))
+    for field, pattern in DOUYIN_FIELD_RES.items():
+        if info[field] is None:
+            found = pattern.search(text)
+            if found:
+                value = found.group(1)
+                if field == 'follower':
+                    value = int(value)
+                else:
+                    value = json.loads(f'"{value}"')
+                info[field] = value
+    if info['avatar'] and info['avatar'].startswith('//'):
+        info['avatar'] = 'https:' + info['avatar']
+    return info
@@ -0,0 +1,28 @@
+import time
+
+import guard
+import metrics
+import platforms
+import timeseries
+import tracker
+
+# 请求上游并记录指标和时序
+# 单独成模块：后台进程池按引用传递这个函数，子进程只需导入这里，不会导入 app 并执行其启动逻辑
+
+
+def fetch_and_record(platform, identifier):
+    """请求上游，成功的数值结果同时写入粉丝数时序"""
+    start = time.perf_counter()
+    try:
+        result = platforms.fetch(platform, identifier)
+    except guard.Unavailable as e:
+        # 限速、熔断时不缓存，由 app.lookup_followers 换成旧值
+        result = platforms.failed(str(e), unavailable=True)
+    # 指标标签只用注册表中的平台名，任意输入不能无限增加指标序列
+    label = platform if platforms.get(platform) else 'unknown'
+    metrics.record_fetch(label, result, time.perf_counter() - start)
+    if result.get('success'):
+        follower = tracker.as_number(result.get('follower'))
+        if follower is not None:
+            timeseries.append(platform, identifier, follower)
+    return result
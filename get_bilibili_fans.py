@@ -1,5 +1,35 @@
-import requests
+"""
+粉丝数批量导出
+
+    python get_bilibili_fans.py                      # 交互模式，查询单个B站用户
+    python get_bilibili_fans.py accounts.txt -o out.jsonl
+    cat accounts.txt | python get_bilibili_fans.py - -o out.csv --concurrency 32
+    python get_bilibili_fans.py accounts.txt -o out.jsonl --resume   # 从中断处继续
+
+输入每行一个账号，可混合多个平台：
+    bilibili,2
+    youtube	https://www.youtube.com/@handle
+    telegram:durov
+    12345            （未写平台时使用 --platform，默认 bilibili）
+空行和 # 开头的行会被忽略。结果按完成顺序逐行写出，index 为该账号在输入中的序号（不含空行和注释）
+"""
+import argparse
+import csv
+import itertools
 import json
+import os
+import sys
+import threading
+import time
+
+import http_client
+
+CSV_FIELDS = ['index', 'platform', 'identifier', 'success', 'username', 'follower', 'message']
+PROGRESS_INTERVAL = 2
+CHECKPOINT_INTERVAL = 1
+UNAVAILABLE_RETRY = 2
+EXIT_UNAVAILABLE = 75
+
 
 def get_follower_count(uid):
     """
@@ -11,11 +41,11 @@ def get_follower_count(uid):
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
     }
-    
+
     try:
-        response = requests.get(url, headers=headers)
+        response = http_client.get(url, platform='bilibili', headers=headers)
         data = response.json()
-        
+
         if data["code"] == 0:
             return data["data"]["follower"]
         else:
@@ -23,7 +53,314 @@ def get_follower_count(uid):
     except Exception as e:
         return f"发生错误: {str(e)}"
 
+
+def parse_line(line, default_platform, known):
+    """返回 (platform, identifier)，空行和注释返回 None"""
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+    for sep in ('\t', ','):
+        platform, found, identifier = line.partition(sep)
+        if found and platform.strip() in known and identifier.strip():
+            return platform.strip(), identifier.strip()
+    parts = line.split(None, 1)
+    if len(parts) == 2 and parts[0] in known:
+        return parts[0], parts[1].strip()
+    platform, found, identifier = line.partition(':')
+    if found and platform in known and identifier.strip():
+        return platform, identifier.strip()
+    return default_platform, line
+
+
+def read_items(stream, default_platform, known):
+    """逐行读取，不把整个输入读进内存"""
+    for line in stream:
+        item = parse_line(line, default_platform, known)
+        if item is not None:
+            yield item
+
+
+def count_items(path, default_platform, known):
+    with open(path, encoding='utf-8') as f:
+        return sum(1 for _ in read_items(f, default_platform, known))
+
+
+def apply_rates(rates, max_wait):
+    """
+    --rate 直接覆盖 guard 中该平台的速率，而不是在其上再叠一层限速；
+    拿不到令牌时多等一会儿（批量导出宁可慢也不要失败）
+    """
+    import guard
+    # guard 内单次等待保持较短，更长的等待由 make_lookup 循环重试，期间可以响应中断
+    guard.override_limits(max_wait=min(max_wait, 5))
+    for platform, rate in rates.items():
+        guard.override_limits(platform, rate=rate, burst=max(1, guard.limits(platform)['burst'], rate))
+
+
+def make_lookup(retries, max_wait, stop):
+    """
+    解析标识后直接请求上游（不读结果缓存），临时错误按指数退避重试
+    平台限速或熔断不算结果：等待后重试，超过 max_wait 秒仍不可用时设置 stop 并返回 unavailable
+    """
+    import guard
+    import platforms
+    import resolver
+    import result_cache
+
+    def lookup(platform, identifier):
+        try:
+            canonical = resolver.resolve(platform, identifier)
+        except resolver.Unresolved as e:
+            return e.result
+        attempt = 0
+        deadline = None
+        while True:
+            if stop.is_set():
+                return platforms.failed('导出已停止', unavailable=True)
+            try:
+                result = platforms.fetch(platform, canonical)
+            except guard.Unavailable as e:
+                deadline = deadline or time.time() + max_wait
+                if time.time() >= deadline:
+                    stop.set()
+                    return platforms.failed(str(e), unavailable=True)
+                time.sleep(UNAVAILABLE_RETRY)
+                continue
+            if result_cache.is_cacheable(result) or attempt >= retries:
+                break
+            time.sleep(min(2 ** attempt, 30))
+            attempt += 1
+        return dict(result, canonical=canonical)
+
+    return lookup
+
+
+class Output:
+    """逐条写出并 flush，检查点只记录已连续完成的前缀，乱序完成的部分在续跑时去重"""
+
+    def __init__(self, path, fmt, checkpoint, resume):
+        self.path = path
+        self.fmt = fmt
+        self.checkpoint = checkpoint
+        self.next_index = 0
+        self.done = set()      # 检查点之后已写出的序号，大小不超过并发窗口
+        self.resumed = set()   # 上次运行已写出、本次会被重新查询的序号，不再重复写出
+        if resume and checkpoint and os.path.exists(checkpoint):
+            with open(checkpoint, encoding='utf-8') as f:
+                self.next_index = json.load(f)['next_index']
+            self._trim_partial_line()
+            self.resumed = self._scan_written()
+            self.done = set(self.resumed)
+            mode = 'a'
+        else:
+            mode = 'w'
+        if path == '-':
+            self.file = sys.stdout
+        else:
+            self.file = open(path, mode, encoding='utf-8', newline='')
+        if fmt == 'csv':
+            self.writer = csv.DictWriter(self.file, CSV_FIELDS, extrasaction='ignore')
+            if mode == 'w':
+                self.writer.writeheader()
+        self._last_checkpoint = 0
+
+    def _trim_partial_line(self):
+        """进程被强行终止时最后一行可能只写了一半，续写前截掉"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            pos = size
+            while pos > 0:
+                step = min(4096, pos)
+                f.seek(pos - step)
+                chunk = f.read(step)
+                newline = chunk.rfind(b'\n')
+                if newline != -1:
+                    pos = pos - step + newline + 1
+                    break
+                pos -= step
+            if pos < size:
+                f.truncate(pos)
+
+    def _scan_written(self):
+        written = set()
+        if not os.path.exists(self.path):
+            return written
+        with open(self.path, encoding='utf-8', newline='') as f:
+            rows = csv.DictReader(f) if self.fmt == 'csv' else (json.loads(line) for line in f if line.strip())
+            for row in rows:
+                try:
+                    index = int(row['index'])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if index >= self.next_index:
+                    written.add(index)
+        return written
+
+    def write(self, index, platform, identifier, result):
+        if index in self.resumed:
+            self.resumed.discard(index)
+        elif self.fmt == 'csv':
+            row = {'index': index, 'platform': platform, 'identifier': identifier}
+            row.update(result)
+            row['message'] = result.get('message') or result.get('error') or ''
+            self.writer.writerow(row)
+        else:
+            import batch
+            self.file.write(batch.format_ndjson(index, platform, identifier, result))
+        self.file.flush()
+        if index >= self.next_index:
+            self.done.add(index)
+        while self.next_index in self.done:
+            self.done.discard(self.next_index)
+            self.next_index += 1
+        if time.time() - self._last_checkpoint >= CHECKPOINT_INTERVAL:
+            self.save_checkpoint()
+
+    def save_checkpoint(self):
+        self._last_checkpoint = time.time()
+        if not self.checkpoint:
+            return
+        tmp = self.checkpoint + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'next_index': self.next_index, 'output': self.path}, f)
+        os.replace(tmp, self.checkpoint)
+
+    def close(self):
+        self.save_checkpoint()
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+class Progress:
+    def __init__(self, total, start):
+        self.total = total
+        self.start_index = start
+        self.started = time.time()
+        self.ok = self.failed = 0
+        self._last = 0
+
+    def update(self, result, force=False):
+        if result is not None:
+            if result.get('success'):
+                self.ok += 1
+            else:
+                self.failed += 1
+        now = time.time()
+        if not force and now - self._last < PROGRESS_INTERVAL:
+            return
+        self._last = now
+        done = self.ok + self.failed
+        rate = done / max(now - self.started, 1e-6)
+        line = f'已完成 {self.start_index + done}'
+        if self.total:
+            line += f'/{self.total} ({(self.start_index + done) / self.total:.1%})'
+            if rate > 0:
+                line += f'，预计剩余 {(self.total - self.start_index - done) / rate:.0f}s'
+        print(f'{line}，成功 {self.ok}，失败 {self.failed}，{rate:.1f} 个/秒', file=sys.stderr, flush=True)
+
+
+def parse_rates(values):
+    rates = {}
+    for value in values or []:
+        platform, _, rate = value.partition('=')
+        rates[platform] = float(rate)
+    return rates
+
+
+def run_bulk(args):
+    import batch
+    import platforms
+
+    known = set(platforms.PLATFORMS)
+    fmt = args.format or ('csv' if args.output.endswith('.csv') else 'jsonl')
+    checkpoint = None if args.output == '-' else (args.checkpoint or args.output + '.ckpt')
+    output = Output(args.output, fmt, checkpoint, args.resume)
+
+    total = None
+    if args.input == '-':
+        stream = sys.stdin
+    else:
+        if not args.no_count:
+            total = count_items(args.input, args.platform, known)
+        stream = open(args.input, encoding='utf-8')
+
+    config = batch.batch_config()
+    if args.concurrency:
+        config['default_concurrency'] = args.concurrency
+        config['concurrency'] = {p: min(batch.concurrency(p, config)[1], args.concurrency) for p in known}
+    window = args.concurrency * 4 if args.concurrency else 256
+
+    start = output.next_index
+    items = itertools.islice(read_items(stream, args.platform, known), start, None)
+    apply_rates(parse_rates(args.rate), args.max_wait)
+    stop = threading.Event()
+    lookup = make_lookup(args.retries, args.max_wait, stop)
+    stopped = None
+    progress = Progress(total, start)
+    record = None
+    if args.record:
+        import timeseries
+        import tracker
+        record = (timeseries, tracker)
+    try:
+        for index, platform, identifier, result in batch.run_batch(items, lookup, config, window, start):
+            if result.get('unavailable'):
+                # 不写出、不推进检查点，续跑时从这里重新查询
+                stopped = result
+                break
+            output.write(index, platform, identifier, result)
+            if record and result.get('success'):
+                follower = record[1].as_number(result.get('follower'))
+                if follower is not None:
+                    record[0].append(platform, result.get('canonical', identifier), follower)
+            progress.update(result)
+    except KeyboardInterrupt:
+        # 让等待令牌或熔断恢复的查询尽快返回，排队中的查询直接丢弃，进程才能及时退出
+        stop.set()
+        batch.shutdown(cancel_futures=True)
+        print('已中断，使用 --resume 可从检查点继续', file=sys.stderr)
+        return 130
+    finally:
+        output.close()
+        if stream is not sys.stdin:
+            stream.close()
+        if record:
+            record[0].get_writer().flush()
+    progress.update(None, force=True)
+    if stopped is not None:
+        print(f"{stopped.get('message')}，已停止导出，稍后使用 --resume 从检查点继续", file=sys.stderr)
+        return EXIT_UNAVAILABLE
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', nargs='?', help='账号列表文件，- 表示标准输入；不填进入交互模式')
+    parser.add_argument('-o', '--output', default='-', help='结果文件，.csv 结尾输出 CSV，否则 JSONL；默认标准输出')
+    parser.add_argument('--format', choices=['jsonl', 'csv'])
+    parser.add_argument('--platform', default='bilibili', help='未写平台的行使用的平台')
+    parser.add_argument('--concurrency', type=int, help='每个平台同时进行的查询数上限，默认使用 batch 配置')
+    parser.add_argument('--rate', action='append', metavar='PLATFORM=N',
+                        help='覆盖 limits 配置中该平台的每秒请求数（与 web 进程共用令牌桶），可重复指定')
+    parser.add_argument('--max-wait', type=float, default=600,
+                        help='平台限速或熔断时最多等待的秒数，超过后停止导出，可用 --resume 继续')
+    parser.add_argument('--retries', type=int, default=2, help='临时错误的重试次数')
+    parser.add_argument('--checkpoint', help='检查点文件，默认为 输出文件.ckpt')
+    parser.add_argument('--resume', action='store_true', help='从检查点继续，结果追加到输出文件')
+    parser.add_argument('--record', action='store_true', help='成功的结果同时写入粉丝数历史')
+    parser.add_argument('--no-count', action='store_true', help='不预先统计输入行数（不显示百分比）')
+    args = parser.parse_args()
+
+    if args.input is None:
+        uid = input("请输入B站用户UID: ")
+        follower_count = get_follower_count(uid)
+        print(f"粉丝数: {follower_count}")
+        return 0
+    return run_bulk(args)
+
+
 if __name__ == "__main__":
-    uid = input("请输入B站用户UID: ")
-    follower_count = get_follower_count(uid)
-    print(f"粉丝数: {follower_count}") 
\ No newline at end of file
+    sys.exit(main())
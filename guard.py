@@ -0,0 +1,178 @@
+import threading
+import time
+
+import storage
+from settings import load_api_config
+
+# 按平台的限速和熔断，状态保存在共享库中，所有 gunicorn worker 看到的是同一份
+
+DEFAULT_LIMITS = {
+    'rate': 5.0,                # 每秒补充的令牌数
+    'burst': 10,                # 令牌桶容量
+    'max_wait': 1.0,            # 没有令牌时最多等待多久，超过直接失败
+    'failure_threshold': 5,     # 连续失败多少次后熔断
+    'cooldown': 30,             # 熔断持续秒数，之后放行一个探测请求
+    'max_cooldown': 600,        # Retry-After 的上限
+    'probe_timeout': 30,        # 探测请求多久没有结果视为失败
+}
+# 各平台的默认预算，可在 api_config.json 的 limits 节中按平台覆盖
+PLATFORM_LIMITS = {
+    'bilibili': {'rate': 10.0, 'burst': 20},
+    'youtube': {'rate': 5.0, 'burst': 10},
+    'twitter': {'rate': 1.0, 'burst': 3},
+    'telegram': {'rate': 1.0, 'burst': 3},
+    'xiaohongshu': {'rate': 0.5, 'burst': 2},
+    'douyin': {'rate': 0.5, 'burst': 2},
+}
+
+# 视为上游异常的状态码：412 是 B 站风控，429 限流，5xx 服务端错误
+FAILURE_STATUS = {412, 429, 500, 502, 503, 504}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS rate_buckets (
+    platform TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS breakers (
+    platform TEXT PRIMARY KEY,
+    state TEXT NOT NULL DEFAULT 'closed',
+    failures INTEGER NOT NULL DEFAULT 0,
+    open_until REAL NOT NULL DEFAULT 0,
+    probe_until REAL NOT NULL DEFAULT 0
+);
+'''
+
+
+class Unavailable(Exception):
+    """平台暂时不可用（限速或熔断），调用方应快速失败"""
+
+
+class RateLimited(Unavailable):
+    pass
+
+
+class CircuitOpen(Unavailable):
+    pass
+
+
+_known = set()
+_known_lock = threading.Lock()
+_overrides = {}   # 本进程的限速覆盖，见 override_limits
+
+
+def _db():
+    storage.ensure_schema('guard', SCHEMA)
+    return storage.connect()
+
+
+def limits(platform):
+    config = dict(DEFAULT_LIMITS)
+    config.update(PLATFORM_LIMITS.get(platform, {}))
+    config.update((load_api_config().get('limits') or {}).get(platform) or {})
+    config.update(_overrides.get(None) or {})
+    config.update(_overrides.get(platform) or {})
+    return config
+
+
+def override_limits(platform=None, **values):
+    """
+    只在本进程内覆盖限速参数（如批量导出脚本的 --rate），不改配置文件
+    platform 为 None 时作用于所有平台；令牌桶仍与其他进程共享
+    """
+    _overrides.setdefault(platform, {}).update(values)
+
+
+def _ensure_rows(platform, config):
+    if platform in _known:
+        return
+    db = _db()
+    db.execute('INSERT OR IGNORE INTO rate_buckets (platform, tokens, updated) VALUES (?, ?, ?)',
+               (platform, config['burst'], time.time()))
+    db.execute('INSERT OR IGNORE INTO breakers (platform) VALUES (?)', (platform,))
+    with _known_lock:
+        _known.add(platform)
+
+
+def try_acquire(platform, config):
+    """在一条 UPDATE 里完成补充和扣减，多进程并发时不会超发"""
+    now = time.time()
+    cur = _db().execute(
+        'UPDATE rate_buckets SET tokens = MIN(?, tokens + (? - updated) * ?) - 1, updated = ? '
+        'WHERE platform = ? AND MIN(?, tokens + (? - updated) * ?) >= 1',
+        (config['burst'], now, config['rate'], now, platform, config['burst'], now, config['rate']))
+    return cur.rowcount == 1
+
+
+def is_open(platform):
+    """熔断中（且还没到探测时间）返回 True"""
+    row = _db().execute('SELECT state, open_until FROM breakers WHERE platform = ?',
+                        (platform,)).fetchone()
+    return row is not None and row['state'] != 'closed' and row['open_until'] > time.time()
+
+
+def _check_breaker(platform, config):
+    row = _db().execute('SELECT state, open_until, probe_until FROM breakers WHERE platform = ?',
+                        (platform,)).fetchone()
+    if row is None or row['state'] == 'closed':
+        return
+    now = time.time()
+    if row['open_until'] > now:
+        raise CircuitOpen(f'{platform} 暂时不可用，{int(row["open_until"] - now) + 1} 秒后重试')
+    # 冷却结束：只有抢到探测权的一个请求能通过，其余继续快速失败
+    cur = _db().execute(
+        "UPDATE breakers SET state = 'half_open', probe_until = ? "
+        "WHERE platform = ? AND open_until <= ? AND (state = 'open' OR probe_until < ?)",
+        (now + config['probe_timeout'], platform, now, now))
+    if cur.rowcount != 1:
+        raise CircuitOpen(f'{platform} 正在探测恢复，请稍后重试')
+
+
+def before_request(platform):
+    """请求上游前调用：熔断时抛出 CircuitOpen，限速且等不到令牌时抛出 RateLimited"""
+    config = limits(platform)
+    _ensure_rows(platform, config)
+    _check_breaker(platform, config)
+    deadline = time.monotonic() + config['max_wait']
+    while not try_acquire(platform, config):
+        if time.monotonic() >= deadline:
+            raise RateLimited(f'{platform} 请求过于频繁，请稍后重试')
+        time.sleep(min(0.05 + 1 / max(config['rate'], 0.1) / 4, 0.5))
+
+
+def record_success(platform):
+    _db().execute(
+        "UPDATE breakers SET state = 'closed', failures = 0, open_until = 0, probe_until = 0 "
+        "WHERE platform = ? AND (state != 'closed' OR failures > 0)", (platform,))
+
+
+def record_failure(platform, retry_after=None):
+    """
+    记录一次上游失败；连续失败达到阈值、探测失败或上游给出 Retry-After 时熔断
+    """
+    config = limits(platform)
+    _ensure_rows(platform, config)
+    now = time.time()
+    cooldown = config['cooldown']
+    if retry_after:
+        cooldown = min(max(cooldown, retry_after), config['max_cooldown'])
+    _db().execute(
+        "UPDATE breakers SET failures = failures + 1, "
+        "state = CASE WHEN ? OR state = 'half_open' OR failures + 1 >= ? THEN 'open' ELSE state END, "
+        "open_until = CASE WHEN ? OR state = 'half_open' OR failures + 1 >= ? THEN ? ELSE open_until END "
+        "WHERE platform = ?",
+        (bool(retry_after), config['failure_threshold'], bool(retry_after), config['failure_threshold'],
+         now + cooldown, platform))
+
+
+def parse_retry_after(value):
+    """只处理秒数形式的 Retry-After，HTTP 日期形式按没有处理"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def status():
+    rows = _db().execute('SELECT platform, state, failures, open_until FROM breakers').fetchall()
+    return {row['platform']: dict(row) for row in rows}
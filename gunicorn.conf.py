@@ -0,0 +1,7 @@
+# gunicorn 启动时自动读取当前目录下的本文件
+
+
+def post_worker_init(worker):
+    """worker 加载应用后立即预渲染页面、启动调度，不必等到第一个请求"""
+    import app
+    app.start()
@@ -0,0 +1,148 @@
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry, make_headers
+
+import guard
+import metrics
+from settings import load_api_config
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# 默认连接池与超时配置，可在 api_config.json 的 http 节中覆盖
+# hosts 按域名单独设置连接池大小，例如 {"api.bilibili.com": 32}
+DEFAULT_HTTP_CONFIG = {
+    'pool_connections': 10,
+    'pool_maxsize': 10,
+    'connect_timeout': 3.05,
+    'read_timeout': 10,
+    'retries': 2,
+    'backoff_factor': 0.3,
+    'backoff_jitter': 0.5,
+    'hosts': {
+        'api.bilibili.com': 20,
+        'www.googleapis.com': 10,
+        't.me': 10,
+        'www.xiaohongshu.com': 5,
+    },
+}
+
+# 传输层只对 5xx 做短暂退避重试；429 和 Retry-After 不在这里等待，
+# 直接返回给调用方，由 guard 按 Retry-After 熔断，避免 worker 被上游的长等待卡住
+RETRY_STATUS = (500, 502, 503, 504)
+
+# 压测时把所有上游请求改写到本地替身服务：https://host/path -> <override>/host/path
+UPSTREAM_OVERRIDE = os.environ.get('UPMIAO_UPSTREAM_OVERRIDE', '').rstrip('/')
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+_timeout = (DEFAULT_HTTP_CONFIG['connect_timeout'], DEFAULT_HTTP_CONFIG['read_timeout'])
+
+
+def _build_retry(config):
+    kwargs = dict(
+        total=config['retries'],
+        connect=config['retries'],
+        read=config['retries'],
+        status=config['retries'],
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        backoff_factor=config['backoff_factor'],
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    try:
+        return Retry(backoff_jitter=config['backoff_jitter'], **kwargs)
+    except TypeError:
+        # urllib3 1.x 没有 backoff_jitter
+        return Retry(**kwargs)
+
+
+def _build_session():
+    config = dict(DEFAULT_HTTP_CONFIG)
+    config.update(load_api_config().get('http') or {})
+    hosts = dict(DEFAULT_HTTP_CONFIG['hosts'])
+    hosts.update(config.get('hosts') or {})
+
+    global _timeout
+    _timeout = (config['connect_timeout'], config['read_timeout'])
+
+    retry = _build_retry(config)
+    session = requests.Session()
+    # 未安装 brotli 时 make_headers 只会声明 gzip,deflate
+    session.headers.update(make_headers(accept_encoding=True))
+    session.headers['User-Agent'] = USER_AGENT
+
+    default_adapter = HTTPAdapter(pool_connections=config['pool_connections'],
+                                  pool_maxsize=config['pool_maxsize'],
+                                  max_retries=retry)
+    session.mount('https://', default_adapter)
+    session.mount('http://', default_adapter)
+    for host, size in hosts.items():
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size, max_retries=retry)
+        session.mount(f'https://{host}/', adapter)
+        session.mount(f'http://{host}/', adapter)
+    return session
+
+
+def get_session():
+    """返回本进程共享的 Session（fork 之后重新创建，避免子进程复用父进程的连接）"""
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                _session = _build_session()
+                _session_pid = pid
+    return _session
+
+
+def reset_session():
+    """配置变更后丢弃旧连接池"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def get(url, platform=None, **kwargs):
+    """
+    带默认超时、重试和长连接的 GET
+    :param platform: 指定后经过该平台的共享限速和熔断，412/429/5xx 和网络错误计为失败
+    """
+    session = get_session()
+    kwargs.setdefault('timeout', _timeout)
+    if UPSTREAM_OVERRIDE:
+        url = UPSTREAM_OVERRIDE + '/' + url.split('://', 1)[-1]
+    if platform is None:
+        return session.get(url, **kwargs)
+
+    guard.before_request(platform)
+    start = time.perf_counter()
+    try:
+        response = session.get(url, **kwargs)
+    except requests.Timeout:
+        metrics.inc('upmiao_upstream_status_total', platform=platform, status='timeout')
+        guard.record_failure(platform)
+        raise
+    except requests.RequestException:
+        metrics.inc('upmiao_upstream_status_total', platform=platform, status='error')
+        guard.record_failure(platform)
+        raise
+    # elapsed 到收到响应头为止；非流式请求此时响应体已读完，差值即为传输耗时
+    upstream = response.elapsed.total_seconds()
+    metrics.observe('upmiao_phase_seconds', upstream, phase='upstream', platform=platform)
+    if not kwargs.get('stream'):
+        metrics.observe('upmiao_phase_seconds', max(0.0, time.perf_counter() - start - upstream),
+                        phase='transfer', platform=platform)
+    metrics.inc('upmiao_upstream_status_total', platform=platform, status=str(response.status_code))
+    if response.status_code in guard.FAILURE_STATUS:
+        guard.record_failure(platform, guard.parse_retry_after(response.headers.get('Retry-After')))
+    else:
+        guard.record_success(platform)
+    return response
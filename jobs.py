@@ -0,0 +1,239 @@
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+import platforms
+import result_cache
+import storage
+from logutil import get_logger, setup_logging
+from settings import load_api_config
+
+# 慢平台（需要浏览器）的查询放到独立的进程池执行，web worker 只负责入队和查询状态
+DEFAULT_JOBS_CONFIG = {
+    'slow_platforms': None,  # 默认为平台注册表中声明为 slow 的平台
+    'workers': 1,          # 每个 web 进程的后台进程数
+    'deadline': 60,        # 单个任务的总时限（秒），超时的排队任务直接放弃
+    'max_pending': 20,     # 所有进程合计的排队上限，超过后拒绝新任务
+    'max_wait': 25,        # 长轮询最长等待秒数
+    'keep': 3600,          # 已完成任务保留多久
+    # 后台进程的启动方式：web 进程里已有调度、推送等线程持有锁，直接 fork 可能让子进程死锁
+    'start_method': 'forkserver',
+}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    platform TEXT NOT NULL,
+    identifier TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    created_at REAL NOT NULL,
+    deadline REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, platform, identifier);
+'''
+
+ACTIVE = ('queued', 'running')
+
+log = get_logger('jobs')
+
+
+class QueueFull(Exception):
+    """排队任务过多，拒绝新任务"""
+
+
+def _db():
+    storage.ensure_schema('jobs', SCHEMA)
+    return storage.connect()
+
+
+def jobs_config():
+    config = dict(DEFAULT_JOBS_CONFIG)
+    config.update(load_api_config().get('jobs') or {})
+    return config
+
+
+def is_slow(platform, config=None):
+    slow = (config or jobs_config())['slow_platforms']
+    if slow is None:
+        entry = platforms.get(platform)
+        return entry is not None and entry.slow
+    return platform in slow
+
+
+def _finish(job_id, status, result):
+    _db().execute('UPDATE jobs SET status = ?, result = ?, updated_at = ? WHERE id = ?',
+                  (status, json.dumps(result, ensure_ascii=False), time.time(), job_id))
+
+
+def run_job(job_id, platform, identifier, deadline, fetch):
+    """在后台进程中执行；结果写入共享库，任何 web 进程都能查到"""
+    if time.time() > deadline:
+        _finish(job_id, 'expired', {'success': False, 'message': '排队超时，请稍后重试'})
+        return
+    _db().execute("UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?",
+                  (time.time(), job_id))
+    box = {}
+
+    def target():
+        try:
+            box['result'] = fetch(platform, identifier)
+        except Exception as e:
+            box['result'] = {'success': False, 'error': str(e)}
+
+    # 查询在线程中执行，超过任务时限就放弃等待
+    worker = threading.Thread(target=target, name='job', daemon=True)
+    worker.start()
+    worker.join(max(0.0, deadline - time.time()))
+    if worker.is_alive():
+        _finish(job_id, 'expired', {'success': False, 'message': '查询超时，请稍后重试'})
+        log.warning("后台任务超时，重启后台进程 platform=%s identifier=%s", platform, identifier)
+        # 卡住的线程无法中断，退出进程让进程池换一个新的子进程
+        os._exit(1)
+    result = box['result']
+    result_cache.store(platform, identifier, result)
+    _finish(job_id, 'done', result)
+    try:
+        import timeseries
+        timeseries.get_writer().flush()
+    except Exception:
+        log.exception("写入粉丝数时序失败")
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(config):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            method = config['start_method']
+            if method not in multiprocessing.get_all_start_methods():
+                method = 'spawn'
+            # forkserver/spawn 启动的子进程不继承父进程的日志配置，启动时重新配置
+            _executor = ProcessPoolExecutor(max_workers=config['workers'],
+                                            mp_context=multiprocessing.get_context(method),
+                                            initializer=setup_logging)
+        return _executor
+
+
+def _reset_executor(executor):
+    """子进程异常退出后进程池不可再用，丢弃后下次提交时重建"""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+
+def _fail(job_id, message):
+    """仍在进行中的任务标记为失败，已结束（如已超时）的保持不变"""
+    _db().execute("UPDATE jobs SET status = 'failed', result = ?, updated_at = ? "
+                  "WHERE id = ? AND status IN (?, ?)",
+                  (json.dumps({'success': False, 'message': message}, ensure_ascii=False),
+                   time.time(), job_id, *ACTIVE))
+
+
+def _job_done(job_id, executor, future):
+    if future.cancelled():
+        _fail(job_id, '任务已取消，请稍后重试')
+        return
+    error = future.exception()
+    if error is None:
+        return
+    log.warning("后台任务异常 job_id=%s error=%r", job_id, error)
+    if isinstance(error, BrokenProcessPool):
+        _reset_executor(executor)
+    _fail(job_id, '后台查询进程异常退出，请稍后重试')
+
+
+def _cleanup(config):
+    now = time.time()
+    db = _db()
+    db.execute('DELETE FROM jobs WHERE updated_at < ? AND status NOT IN (?, ?)',
+               (now - config['keep'], *ACTIVE))
+    # 后台进程异常退出时，超过时限的任务不会再有人更新
+    db.execute("UPDATE jobs SET status = 'expired', updated_at = ? "
+               "WHERE status IN (?, ?) AND deadline < ?", (now, *ACTIVE, now - 5))
+
+
+def submit(platform, identifier, fetch, config=None):
+    """
+    入队并返回任务 ID；相同账号已有进行中的任务时直接复用
+    fetch 按引用传给子进程，必须是可导入模块中的顶层函数（如 fetcher.fetch_and_record）
+    排队数超过 max_pending 时抛出 QueueFull
+    """
+    config = config or jobs_config()
+    db = _db()
+    _cleanup(config)
+    row = db.execute('SELECT id FROM jobs WHERE platform = ? AND identifier = ? AND status IN (?, ?)',
+                     (platform, identifier, *ACTIVE)).fetchone()
+    if row is not None:
+        return row['id']
+    pending = db.execute('SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)', ACTIVE).fetchone()[0]
+    if pending >= config['max_pending']:
+        raise QueueFull()
+
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    deadline = now + config['deadline']
+    db.execute('INSERT INTO jobs (id, platform, identifier, status, created_at, deadline, updated_at) '
+               "VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+               (job_id, platform, identifier, now, deadline, now))
+    # 缓存的进程池可能已经损坏，重建后再试一次
+    for _ in range(2):
+        executor = _get_executor(config)
+        try:
+            future = executor.submit(run_job, job_id, platform, identifier, deadline, fetch)
+        except BrokenProcessPool:
+            _reset_executor(executor)
+            continue
+        future.add_done_callback(partial(_job_done, job_id, executor))
+        return job_id
+    _fail(job_id, '后台查询进程不可用，请稍后重试')
+    return job_id
+
+
+def get(job_id):
+    row = _db().execute('SELECT id, platform, identifier, status, result, created_at, deadline '
+                        'FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    if row is None:
+        return None
+    job = dict(row)
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    if job['status'] in ACTIVE and time.time() > job['deadline']:
+        job['status'] = 'expired'
+    return job
+
+
+def wait(job_id, timeout):
+    """长轮询：任务结束或超时后返回当前状态"""
+    end = time.time() + timeout
+    delay = 0.05
+    while True:
+        job = get(job_id)
+        if job is None or job['status'] not in ACTIVE or time.time() >= end:
+            return job
+        time.sleep(min(delay, max(0, end - time.time())))
+        delay = min(delay * 2, 0.5)
+
+
+def run_and_wait(platform, identifier, fetch, config=None):
+    """同步调用方使用：入队后等待结果，超过时限返回失败"""
+    config = config or jobs_config()
+    try:
+        job_id = submit(platform, identifier, fetch, config)
+    except QueueFull:
+        return {'success': False, 'message': '查询排队过多，请稍后重试'}
+    job = wait(job_id, config['deadline'])
+    if job is not None and job['status'] in ('done', 'failed'):
+        return job['result']
+    return {'success': False, 'message': '查询超时，请稍后重试'}
@@ -0,0 +1,185 @@
+import json
+import queue
+import threading
+import time
+
+import avatars
+import result_cache
+import tracker
+from logutil import get_logger
+from settings import load_api_config
+
+# 实时推送
+# 浏览器订阅的账号以租约形式临时加入后台轮询，上游请求只由调度器发起一次；
+# 有客户端在看时各进程定期续租，最后一个客户端断开 lease 秒后账号移出轮询。
+# 每个进程只有一个线程从共享库读取变化，序列化一次后分发给所有订阅者
+
+DEFAULT_LIVE_CONFIG = {
+    'interval': 60,       # 被订阅账号的轮询间隔（秒）
+    'poll': 1.0,          # 从共享库读取变化的周期
+    'heartbeat': 15,      # 心跳间隔，防止代理断开空闲连接
+    'queue_size': 100,    # 单个客户端积压的事件上限，超过则断开慢客户端
+    'max_accounts': 100,  # 单个连接最多订阅的账号数
+    'lease': 600,         # 没有客户端订阅后继续轮询的秒数
+    'max_leased': 1000,   # 因订阅而临时轮询的账号总数上限
+}
+
+log = get_logger('live')
+
+
+def live_config():
+    config = dict(DEFAULT_LIVE_CONFIG)
+    config.update(load_api_config().get('live') or {})
+    return config
+
+
+def format_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+
+def account_payload(platform, identifier, result):
+    return {
+        'platform': platform,
+        'identifier': identifier,
+        'username': result.get('username'),
+        'avatar': avatars.proxy_url(result.get('avatar')),
+        'follower': result.get('follower'),
+    }
+
+
+class Client:
+    def __init__(self, keys, queue_size):
+        self.keys = keys
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.closed = False
+
+    def send(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            self.closed = True
+
+
+class Hub:
+    """本进程内的订阅表和变化广播"""
+
+    def __init__(self):
+        self.config = live_config()
+        self._lock = threading.Lock()
+        self._subscribers = {}   # (platform, identifier) -> set(Client)
+        self._last_sent = {}     # (platform, identifier) -> follower
+        self._since = time.time()
+        self._renewed = time.time()
+        self._thread = None
+
+    def subscribe(self, keys):
+        client = Client(keys, self.config['queue_size'])
+        for platform, identifier in keys:
+            if not tracker.lease(platform, identifier, self.config['interval'],
+                                 self.config['lease'], self.config['max_leased']):
+                log.warning("临时轮询账号数已达上限，不再加入 platform=%s identifier=%s", platform, identifier)
+        with self._lock:
+            for key in keys:
+                self._subscribers.setdefault(key, set()).add(client)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='live', daemon=True)
+                self._thread.start()
+        return client
+
+    def unsubscribe(self, client):
+        with self._lock:
+            for key in client.keys:
+                clients = self._subscribers.get(key)
+                if clients is None:
+                    continue
+                clients.discard(client)
+                if not clients:
+                    del self._subscribers[key]
+                    self._last_sent.pop(key, None)
+
+    def snapshot(self, keys):
+        """
+        新连接先收到一次当前值；调度器还没轮询到的账号先用查询缓存里的值，标记 stale，
+        且不记入已推送，调度器第一次轮询后一定会推送 update
+        """
+        items = []
+        for platform, identifier in keys:
+            result = tracker.latest(platform, identifier)
+            if result is not None:
+                items.append(account_payload(platform, identifier, result))
+                with self._lock:
+                    self._last_sent.setdefault((platform, identifier), result.get('follower'))
+                continue
+            cached, _ = result_cache.lookup(platform, identifier)
+            if cached is not None:
+                items.append(dict(account_payload(platform, identifier, cached), stale=True))
+        return format_event('snapshot', items)
+
+    def _run(self):
+        while True:
+            time.sleep(self.config['poll'])
+            try:
+                self.broadcast_changes()
+                self.renew()
+            except Exception:
+                log.exception("实时推送出错")
+
+    def renew(self):
+        """为本进程仍有人订阅的账号续租"""
+        if time.time() - self._renewed < self.config['lease'] / 4:
+            return
+        self._renewed = time.time()
+        with self._lock:
+            keys = list(self._subscribers)
+        if keys:
+            tracker.renew_leases(keys, self.config['lease'])
+
+    def broadcast_changes(self):
+        since = self._since
+        for platform, identifier, result, fetched in tracker.changed_since(since):
+            self._since = max(self._since, fetched)
+            key = (platform, identifier)
+            with self._lock:
+                clients = list(self._subscribers.get(key, ()))
+                if not clients or self._last_sent.get(key) == result.get('follower'):
+                    continue
+                self._last_sent[key] = result.get('follower')
+            # 只推送粉丝数变化，一次序列化分发给所有订阅者
+            message = format_event('update', account_payload(platform, identifier, result))
+            for client in clients:
+                client.send(message)
+
+    def stream(self, keys):
+        client = self.subscribe(keys)
+        try:
+            yield 'retry: 5000\n\n'
+            yield self.snapshot(keys)
+            while not client.closed:
+                try:
+                    yield client.queue.get(timeout=self.config['heartbeat'])
+                except queue.Empty:
+                    yield ': ping\n\n'
+        finally:
+            self.unsubscribe(client)
+
+
+def parse_accounts(value, limit):
+    """accounts=bilibili:2,youtube:UCxxx"""
+    keys = []
+    for part in (value or '').split(','):
+        platform, sep, identifier = part.strip().partition(':')
+        if sep and platform and identifier.strip():
+            keys.append((platform, identifier.strip()))
+    return list(dict.fromkeys(keys))[:limit]
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub():
+    global _hub
+    with _hub_lock:
+        if _hub is None:
+            _hub = Hub()
+        return _hub
@@ -0,0 +1,39 @@
+import logging
+import random
+
+from settings import load_api_config
+
+# 统一的日志配置：按级别过滤，调试日志再按比例采样，热路径上不做无用的格式化
+
+LOG_FORMAT = '%(asctime)s %(levelname)s %(process)d %(name)s %(message)s'
+
+DEFAULT_LOGGING_CONFIG = {
+    'level': 'INFO',
+    'debug_sample_rate': 0.01,  # DEBUG 级别下，逐条响应之类的调试日志只记录这个比例
+}
+
+_sample_rate = DEFAULT_LOGGING_CONFIG['debug_sample_rate']
+
+
+def setup_logging():
+    global _sample_rate
+    config = dict(DEFAULT_LOGGING_CONFIG)
+    config.update(load_api_config().get('logging') or {})
+    _sample_rate = float(config['debug_sample_rate'])
+    root = logging.getLogger('upmiao')
+    root.setLevel(getattr(logging, str(config['level']).upper(), logging.INFO))
+    if not root.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        root.addHandler(handler)
+        root.propagate = False
+
+
+def get_logger(name):
+    return logging.getLogger(f'upmiao.{name}')
+
+
+def debug_sampled(logger, msg, *args):
+    """级别未开启 DEBUG 时几乎零开销；开启后也只按比例记录"""
+    if logger.isEnabledFor(logging.DEBUG) and random.random() < _sample_rate:
+        logger.debug(msg, *args)
@@ -0,0 +1,174 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import storage
+
+# 进程内计数，定期合并到共享库，/metrics 汇总所有 gunicorn worker 的数据
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+FLUSH_INTERVAL = 5
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS metrics (
+    pid INTEGER PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+'''
+
+HELP = {
+    'upmiao_phase_seconds': ('histogram', '各平台各阶段耗时（upstream=等待响应头，transfer=读取响应体，parse=解析，fetch=单次查询总耗时，serialize=序列化响应）'),
+    'upmiao_fetch_total': ('counter', '各平台查询结果计数（success/error/timeout/unavailable）'),
+    'upmiao_upstream_status_total': ('counter', '上游 HTTP 状态码计数'),
+}
+
+_lock = threading.Lock()
+_histograms = {}   # (name, labels) -> [bucket counts..., sum, count]
+_counters = {}     # (name, labels) -> value
+_last_flush = 0.0
+
+
+def _labels(**labels):
+    return tuple(sorted(labels.items()))
+
+
+def observe(name, seconds, **labels):
+    key = (name, _labels(**labels))
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [0] * (len(LATENCY_BUCKETS) + 2)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                hist[i] += 1
+                break
+        hist[-2] += seconds
+        hist[-1] += 1
+    _maybe_flush()
+
+
+def inc(name, value=1, **labels):
+    key = (name, _labels(**labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+    _maybe_flush()
+
+
+@contextmanager
+def timer(phase, platform):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe('upmiao_phase_seconds', time.perf_counter() - start, phase=phase, platform=platform)
+
+
+def record_fetch(platform, result, seconds):
+    """按结果分类计数：超时和限速熔断单独统计"""
+    if result.get('success'):
+        outcome = 'success'
+    elif result.get('circuit_open') or result.get('unavailable'):
+        outcome = 'unavailable'
+    elif 'timed out' in f"{result.get('message', '')} {result.get('error', '')}".lower():
+        outcome = 'timeout'
+    else:
+        outcome = 'error'
+    inc('upmiao_fetch_total', platform=platform, outcome=outcome)
+    observe('upmiao_phase_seconds', seconds, phase='fetch', platform=platform)
+
+
+def _snapshot():
+    with _lock:
+        return {
+            'h': [[name, list(labels), list(values)] for (name, labels), values in _histograms.items()],
+            'c': [[name, list(labels), value] for (name, labels), value in _counters.items()],
+        }
+
+
+def flush():
+    global _last_flush
+    _last_flush = time.time()
+    storage.ensure_schema('metrics', SCHEMA)
+    storage.connect().execute('INSERT OR REPLACE INTO metrics (pid, data, updated) VALUES (?, ?, ?)',
+                              (os.getpid(), json.dumps(_snapshot()), _last_flush))
+
+
+def _maybe_flush():
+    if time.time() - _last_flush >= FLUSH_INTERVAL:
+        try:
+            flush()
+        except Exception:
+            pass
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def render(gauges=None):
+    """Prometheus 文本格式，汇总所有进程（包括近期退出的进程）的数据"""
+    flush()
+    db = storage.connect()
+    # 已退出一天以上的进程不再计入，避免重启多次后快照无限增长
+    for row in db.execute('SELECT pid FROM metrics WHERE updated < ?', (time.time() - 86400,)).fetchall():
+        if not _alive(row['pid']):
+            db.execute('DELETE FROM metrics WHERE pid = ?', (row['pid'],))
+    histograms, counters = {}, {}
+    for row in db.execute('SELECT pid, data FROM metrics').fetchall():
+        data = json.loads(row['data'])
+        for name, labels, values in data['h']:
+            key = (name, tuple(tuple(l) for l in labels))
+            total = histograms.setdefault(key, [0] * len(values))
+            for i, v in enumerate(values):
+                total[i] += v
+        for name, labels, value in data['c']:
+            key = (name, tuple(tuple(l) for l in labels))
+            counters[key] = counters.get(key, 0) + value
+
+    lines = []
+    seen = set()
+
+    def header(name):
+        if name not in seen:
+            seen.add(name)
+            kind, text = HELP.get(name, ('untyped', name))
+            lines.append(f'# HELP {name} {text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+    for (name, labels), values in sorted(histograms.items()):
+        header(name)
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, values):
+            cumulative += count
+            lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+        lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {values[-1]}')
+        lines.append(f'{name}_sum{_format_labels(labels)} {values[-2]}')
+        lines.append(f'{name}_count{_format_labels(labels)} {values[-1]}')
+    for (name, labels), value in sorted(counters.items()):
+        header(name)
+        lines.append(f'{name}{_format_labels(labels)} {value}')
+    for name, (text, value) in (gauges or {}).items():
+        lines.append(f'# HELP {name} {text}')
+        lines.append(f'# TYPE {name} gauge')
+        lines.append(f'{name} {value}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,141 @@
+import importlib
+import threading
+
+import guard
+from coalescer import MicroBatcher
+from settings import load_api_config
+
+# 平台注册表
+# 每个平台的查询逻辑是一个独立模块，第一次查询该平台时才导入，
+# 只查 B 站、YouTube 的部署不会加载 selenium、bs4 等重量级依赖
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+
+class Platform:
+    """
+    平台声明
+    :param module: 查询模块，需提供 fetch(identifier) -> 结果字典，guard.Unavailable 需原样抛出；
+        可选提供 normalize(text) -> (别名, 规范 ID 或 None) 和 resolve(别名) -> 规范 ID 或 None，
+        见 resolver.py
+    :param batchable: 上游支持一次请求查询多个账号，模块需提供 fetch_many(identifiers) -> {identifier: 结果}，
+        可选提供 not_found(identifier)；并发的单个查询在进程内合并，批量查询的并发数按 max_batch 放开
+    :param max_batch: 单次上游请求最多合并的账号数
+    :param slow: 单次查询耗时长，应放到后台进程池执行
+    :param needs_browser: 可能需要启动浏览器
+    :param message: 尚未实现的平台直接返回该提示
+    """
+
+    def __init__(self, name, module=None, batchable=False, max_batch=1, slow=False, needs_browser=False,
+                 message=None):
+        self.name = name
+        self.module = module
+        self.batchable = batchable
+        self.max_batch = max_batch if batchable else 1
+        self.slow = slow
+        self.needs_browser = needs_browser
+        self.message = message
+
+    def capabilities(self):
+        return {
+            'batchable': self.batchable,
+            'max_batch': self.max_batch,
+            'slow': self.slow,
+            'needs_browser': self.needs_browser,
+            'implemented': self.module is not None,
+        }
+
+
+PLATFORMS = {p.name: p for p in (
+    Platform('bilibili', 'platforms.bilibili'),
+    # channels 接口单次最多 50 个 id，配额消耗与单个相同
+    Platform('youtube', 'platforms.youtube', batchable=True, max_batch=50),
+    Platform('twitter', 'platforms.twitter'),
+    Platform('telegram', 'platforms.telegram'),
+    Platform('telegram_group', 'platforms.telegram_group'),
+    Platform('xiaohongshu', 'platforms.xiaohongshu'),
+    Platform('douyin', 'platforms.douyin', slow=True, needs_browser=True),
+    Platform('wechat_mp', message='公众号粉丝数查询暂未实现'),
+    Platform('kuaishou', message='快手粉丝数查询暂未实现'),
+    Platform('wechat_video', message='视频号粉丝数查询暂未实现'),
+)}
+
+_modules = {}
+_import_lock = threading.Lock()
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def found(username, follower, avatar=None, **extra):
+    """统一的成功结果；avatar 为上游原地址，返回给浏览器时再换成代理地址（avatars.for_client）"""
+    result = {'success': True, 'username': username, 'avatar': avatar, 'follower': follower}
+    result.update(extra)
+    return result
+
+
+def failed(message, not_found=False, **extra):
+    """统一的失败结果；not_found 表示账号确实不存在，可以短时间缓存"""
+    result = {'success': False, 'message': message}
+    if not_found:
+        result['not_found'] = True
+    result.update(extra)
+    return result
+
+
+def get(name):
+    return PLATFORMS.get(name)
+
+
+def _load(platform):
+    module = _modules.get(platform.name)
+    if module is None:
+        with _import_lock:
+            module = _modules.get(platform.name)
+            if module is None:
+                module = _modules[platform.name] = importlib.import_module(platform.module)
+    return module
+
+
+def module(name):
+    """平台模块，未知或未实现的平台返回 None"""
+    platform = PLATFORMS.get(name)
+    if platform is None or platform.module is None:
+        return None
+    return _load(platform)
+
+
+def _batcher(platform, module):
+    """可合并平台的查询合并器，窗口可在 api_config.json 的 <平台>_batch.window_ms 中设置"""
+    batcher = _batchers.get(platform.name)
+    if batcher is None:
+        with _batchers_lock:
+            batcher = _batchers.get(platform.name)
+            if batcher is None:
+                window_ms = (load_api_config().get(f'{platform.name}_batch') or {}).get('window_ms', 10)
+                batcher = _batchers[platform.name] = MicroBatcher(
+                    module.fetch_many, window=window_ms / 1000, max_batch=platform.max_batch,
+                    missing=getattr(module, 'not_found', None))
+    return batcher
+
+
+def fetch(name, identifier):
+    """按平台分发查询，返回统一的结果字典（不经过缓存）"""
+    platform = PLATFORMS.get(name)
+    if platform is None:
+        return failed('不支持的平台')
+    if platform.module is None:
+        return failed(platform.message)
+    try:
+        module = _load(platform)
+        if platform.batchable:
+            return _batcher(platform, module).get(identifier)
+        return module.fetch(identifier)
+    except guard.Unavailable:
+        # 限速、熔断由调用方处理（有旧值时返回旧值），不当作普通失败
+        raise
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+
+def describe():
+    return {name: p.capabilities() for name, p in PLATFORMS.items()}
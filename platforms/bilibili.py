@@ -0,0 +1,70 @@
+import re
+
+import guard
+import http_client
+import metrics
+from logutil import debug_sampled, get_logger
+from platforms import USER_AGENT, failed, found
+
+CARD_URL = 'https://api.bilibili.com/x/web-interface/card'
+SEARCH_URL = 'https://api.bilibili.com/x/web-interface/search/type'
+UID_RE = re.compile(r'(?:space\.bilibili\.com/|^uid[:：]?\s*)(\d+)', re.I)
+
+log = get_logger('bilibili')
+
+
+def normalize(text):
+    """数字 UID、空间链接直接得到 UID，其余视为昵称"""
+    if text.isdigit():
+        return text, text
+    match = UID_RE.search(text)
+    if match:
+        return match.group(1), match.group(1)
+    name = text.lstrip('@').strip()
+    return name, None
+
+
+def resolve(name):
+    """按昵称搜索用户，只接受昵称完全一致的结果"""
+    headers = {
+        'User-Agent': USER_AGENT,
+        'Referer': 'https://search.bilibili.com'
+    }
+    params = {'search_type': 'bili_user', 'keyword': name}
+    data = http_client.get(SEARCH_URL, platform='bilibili', headers=headers, params=params).json()
+    if data.get('code') != 0:
+        raise RuntimeError(data.get('message') or f"code {data.get('code')}")
+    for user in (data.get('data') or {}).get('result') or []:
+        if user.get('uname') == name:
+            return str(user['mid'])
+    return None
+
+
+def fetch(uid):
+    """
+    获取B站用户信息
+    :param uid: B站用户UID
+    """
+    headers = {
+        'User-Agent': USER_AGENT,
+        'Referer': 'https://www.bilibili.com'
+    }
+    try:
+        response = http_client.get(CARD_URL, platform='bilibili', headers=headers, params={'mid': uid})
+        with metrics.timer('parse', 'bilibili'):
+            data = response.json()
+        debug_sampled(log, "bilibili 响应 uid=%s code=%s", uid, data.get('code'))
+
+        if data['code'] == 0 and 'data' in data and 'card' in data['data']:
+            card = data['data']['card']
+            # 直接使用API返回的头像URL
+            return found(card['name'], card['fans'], card['face'])
+        error_msg = data.get('message', '获取用户信息失败')
+        log.info("bilibili 查询失败 uid=%s code=%s message=%s", uid, data.get('code'), error_msg)
+        # -404/-626 表示用户不存在，可以短时间缓存
+        return failed(error_msg, not_found=data.get('code') in (-404, -626))
+    except guard.Unavailable:
+        raise
+    except Exception as e:
+        log.warning("bilibili 请求异常 uid=%s error=%s", uid, e)
+        return failed(str(e))
@@ -0,0 +1,123 @@
+import atexit
+import re
+import threading
+
+import extract
+import guard
+import http_client
+import metrics
+from logutil import get_logger
+from platforms import USER_AGENT, failed, found
+from settings import load_api_config
+
+# 浏览器池依赖 selenium，只在需要浏览器兜底时导入
+
+USER_RE = re.compile(r'douyin\.com/(?:share/)?user/([\w-]+)')
+SHORT_LINK_RE = re.compile(r'https?://v\.douyin\.com/[\w-]+/?')
+
+log = get_logger('douyin')
+
+_pool = None
+_pool_lock = threading.Lock()
+_cookie_jar = None
+
+
+def normalize(text):
+    """主页链接中取出 sec_uid；分享短链接需要请求一次才知道指向谁"""
+    match = USER_RE.search(text)
+    if match:
+        return match.group(1), match.group(1)
+    match = SHORT_LINK_RE.search(text)
+    if match:
+        return match.group(0).rstrip('/'), None
+    return text, text
+
+
+def resolve(short_link):
+    """跟随短链接的跳转，从最终地址中取出 sec_uid"""
+    resp = http_client.get(short_link, platform='douyin', headers={'User-Agent': USER_AGENT}, stream=True)
+    resp.close()
+    match = USER_RE.search(resp.url)
+    return match.group(1) if match else None
+
+
+def get_cookie_jar():
+    global _cookie_jar
+    with _pool_lock:
+        if _cookie_jar is None:
+            from douyin_cookies import CookieJar
+            _cookie_jar = CookieJar()
+        return _cookie_jar
+
+
+def get_pool():
+    """按进程懒加载抖音浏览器池（gunicorn fork 之后才创建浏览器）"""
+    global _pool
+    cookie_jar = get_cookie_jar()
+    with _pool_lock:
+        if _pool is None:
+            from douyin_pool import DriverPool
+            _pool = DriverPool(load_api_config().get('douyin_pool'), cookie_jar)
+            atexit.register(_pool.close)
+        return _pool
+
+
+def cookie_header():
+    """浏览器池保存的登录 cookie，转换成请求头供轻量请求使用"""
+    return '; '.join(f"{c['name']}={c['value']}" for c in get_cookie_jar().get()
+                     if 'name' in c and 'value' in c)
+
+
+def fetch_http(username):
+    """不启动浏览器，直接请求用户主页并读取服务端渲染的数据"""
+    url = f'https://www.douyin.com/user/{username}'
+    headers = {
+        'User-Agent': USER_AGENT,
+        'Referer': 'https://www.douyin.com/',
+        'Accept-Language': 'zh-CN,zh;q=0.9'
+    }
+    try:
+        cookie = cookie_header()
+        if cookie:
+            headers['Cookie'] = cookie
+        resp = http_client.get(url, platform='douyin', headers=headers)
+        if resp.status_code != 200:
+            return failed('无法访问抖音主页')
+        with metrics.timer('parse', 'douyin'):
+            info = extract.extract_douyin(resp.text)
+        if info['follower'] is None:
+            return failed('未能解析抖音粉丝数')
+        return found(info['nickname'] or username, info['follower'], info['avatar'])
+    except guard.Unavailable:
+        raise
+    except Exception as e:
+        return failed(f'请求失败: {str(e)}')
+
+
+def fetch_selenium(username):
+    """浏览器池兜底，头像和昵称同样从页面数据中读取"""
+    try:
+        fans, page_source = get_pool().fetch_page(username)
+    except Exception as e:
+        log.warning("抖音浏览器池查询失败 username=%s error=%s", username, e)
+        return failed('抖音粉丝数获取失败')
+    with metrics.timer('parse', 'douyin'):
+        info = extract.extract_douyin(page_source or '')
+    follower = extract.parse_count(fans)
+    if follower is None:
+        follower = info['follower']
+    if follower is None:
+        return failed('抖音粉丝数获取失败')
+    return found(info['nickname'] or username, follower, info['avatar'])
+
+
+def fetch(username):
+    """先走轻量 HTTP 请求，失败时再用浏览器；source 标明结果来自哪条路径"""
+    result = fetch_http(username)
+    if result['success']:
+        result['source'] = 'http'
+        return result
+    log.info("抖音轻量请求失败，改用浏览器 username=%s message=%s", username, result.get('message'))
+    result = fetch_selenium(username)
+    result['source'] = 'selenium'
+    return result
@@ -0,0 +1,41 @@
+import re
+
+import extract
+import guard
+import http_client
+import metrics
+from platforms import USER_AGENT, failed, found
+
+LINK_RE = re.compile(r'^(?:https?://)?(?:www\.)?(?:t\.me|telegram\.me|telegram\.dog)/(?:s/)?', re.I)
+
+
+def normalize(text):
+    """t.me 链接、@用户名和用户名都归一为小写用户名（Telegram 用户名不区分大小写）"""
+    name = LINK_RE.sub('', text).lstrip('@').split('/')[0].split('?')[0].lower()
+    return name, name
+
+
+def fetch_page(name, kinds, unreachable, unparsed):
+    url = f'https://t.me/s/{name}'
+    try:
+        resp = http_client.get(url, platform='telegram', headers={'User-Agent': USER_AGENT}, stream=True)
+        if resp.status_code != 200:
+            resp.close()
+            return failed(unreachable)
+        # 名称和人数都在页面头部，拿到后不再下载后面的消息流
+        text = extract.read_until(resp, lambda t: extract.telegram_done(t, kinds))
+        with metrics.timer('parse', 'telegram'):
+            title, count = extract.extract_telegram(text, kinds)
+        if count is not None:
+            return found(title or name, count, '/static/telegram.png')
+        return failed(unparsed)
+    except guard.Unavailable:
+        raise
+    except Exception as e:
+        return failed(f'爬取失败: {str(e)}')
+
+
+def fetch(channel_name):
+    """爬取Telegram频道订阅数，兼容@和不同单位"""
+    return fetch_page(channel_name, ('subscriber', 'member'),
+                      '无法访问频道页面', '未能解析订阅数，页面结构可能已变')
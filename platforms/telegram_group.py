@@ -0,0 +1,6 @@
+from platforms.telegram import fetch_page, normalize  # noqa: F401
+
+
+def fetch(group_name):
+    """爬取Telegram群组成员数"""
+    return fetch_page(group_name, ('member',), '无法访问群组页面', '未能解析成员数')
@@ -0,0 +1,38 @@
+import re
+
+import extract
+import guard
+import http_client
+import metrics
+from platforms import USER_AGENT, failed, found
+
+PROFILE_RE = re.compile(r'xiaohongshu\.com/user/profile/([0-9a-zA-Z]+)')
+
+
+def normalize(text):
+    """主页链接中取出用户 ID"""
+    match = PROFILE_RE.search(text)
+    user_id = match.group(1) if match else text
+    return user_id, user_id
+
+
+def fetch(user_id):
+    """爬取小红书用户粉丝数"""
+    url = f'https://www.xiaohongshu.com/user/{user_id}'
+    try:
+        resp = http_client.get(url, platform='xiaohongshu', headers={'User-Agent': USER_AGENT}, stream=True)
+        if resp.status_code != 200:
+            resp.close()
+            return failed('无法访问小红书主页')
+        # 直接读取内嵌的 __INITIAL_STATE__（页面结构可能变化，失败时退回 HTML 匹配）
+        text = extract.read_until(resp, extract.xiaohongshu_done)
+        with metrics.timer('parse', 'xiaohongshu'):
+            info = extract.extract_xiaohongshu(text)
+        if info['follower'] is not None:
+            return found(info['nickname'] or user_id, info['follower'],
+                         info['avatar'] or '/static/xiaohongshu.png')
+        return failed('未能解析粉丝数')
+    except guard.Unavailable:
+        raise
+    except Exception as e:
+        return failed(f'爬取失败: {str(e)}')
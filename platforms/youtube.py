@@ -0,0 +1,103 @@
+import re
+from urllib.parse import unquote, urlsplit
+
+import guard
+import http_client
+from logutil import get_logger
+from platforms import failed, found
+from settings import load_api_config
+
+CHANNELS_URL = 'https://www.googleapis.com/youtube/v3/channels'
+CHANNEL_ID_RE = re.compile(r'^UC[\w-]{22}$')
+
+log = get_logger('youtube')
+
+
+def normalize(text):
+    """
+    频道 ID、/channel/ 链接直接得到频道 ID；
+    @handle、/@handle、/c/ 链接归一为小写的 @handle，/user/ 链接归一为 user:旧用户名
+    """
+    if '/' in text:
+        parts = urlsplit(text if '://' in text else 'https://' + text)
+        segments = [unquote(s) for s in parts.path.split('/') if s]
+        if len(segments) >= 2 and segments[0] == 'channel':
+            text = segments[1]
+        elif len(segments) >= 2 and segments[0] == 'user':
+            return f'user:{segments[1].lower()}', None
+        elif len(segments) >= 2 and segments[0] == 'c':
+            text = '@' + segments[1]
+        elif segments:
+            text = segments[0]
+    if CHANNEL_ID_RE.match(text):
+        return text, text
+    handle = text.lstrip('@').lower()
+    return (f'@{handle}' if handle else ''), None
+
+
+def resolve(alias):
+    """
+    handle 用 channels?forHandle 解析，只消耗 1 个配额单位（search 接口要 100）
+    """
+    api_key = load_api_config().get('youtube')
+    if not api_key:
+        raise RuntimeError('请先在配置页面设置 YouTube API 密钥')
+    params = {'part': 'id', 'key': api_key}
+    if alias.startswith('user:'):
+        params['forUsername'] = alias[len('user:'):]
+    else:
+        params['forHandle'] = alias
+    data = http_client.get(CHANNELS_URL, platform='youtube', params=params).json()
+    if 'error' in data:
+        raise RuntimeError(data['error'].get('message', '未知错误'))
+    items = data.get('items') or []
+    return items[0]['id'] if items else None
+
+
+def _fetch_many(channel_ids):
+    params = {
+        'part': 'snippet,statistics',
+        'id': ','.join(channel_ids),
+        'key': load_api_config().get('youtube')
+    }
+    data = http_client.get(CHANNELS_URL, platform='youtube', params=params).json()
+
+    if 'error' in data:
+        error = failed(f"YouTube API 错误: {data['error'].get('message', '未知错误')}")
+        return {channel_id: error for channel_id in channel_ids}
+
+    results = {}
+    for channel in data.get('items', []):
+        results[channel['id']] = found(
+            channel['snippet']['title'],
+            # 隐藏订阅数的频道没有 subscriberCount
+            int(channel['statistics'].get('subscriberCount', 0)),
+            channel['snippet']['thumbnails']['default']['url'])
+    return results
+
+
+def fetch_many(channel_ids):
+    """
+    一次 channels 调用查询多个频道，返回 {频道ID: 结果}
+    注册表把并发的单个查询合并后调用这里，见 platforms.fetch
+    """
+    if not load_api_config().get('youtube'):
+        error = failed('请先在配置页面设置 YouTube API 密钥')
+        return {channel_id: error for channel_id in channel_ids}
+    try:
+        return _fetch_many(channel_ids)
+    except guard.Unavailable:
+        raise
+    except Exception as e:
+        log.warning("YouTube 请求异常 channel_ids=%s error=%s", ','.join(channel_ids), e)
+        error = failed(f'获取 YouTube 信息失败: {str(e)}')
+        return {channel_id: error for channel_id in channel_ids}
+
+
+def not_found(channel_id):
+    return failed('未找到该 YouTube 频道，请确保输入了正确的频道ID', not_found=True)
+
+
+def fetch(channel_id):
+    """获取单个 YouTube 频道信息（不合并）"""
+    return fetch_many([channel_id]).get(channel_id) or not_found(channel_id)
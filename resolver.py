@@ -0,0 +1,97 @@
+import time
+
+import platforms
+import storage
+from coalescer import SingleFlight
+from settings import load_api_config
+
+# 账号标识解析
+# 用户输入的链接、@handle、昵称先由平台模块的 normalize() 规范化：
+# 能直接得到规范 ID 的（数字 UID、频道 ID、链接中的 ID）不访问网络；
+# 只有昵称、handle 这类需要调用上游的才查 identifier_index，结果持久化并按 TTL 刷新
+
+DEFAULT_RESOLVER_CONFIG = {
+    'ttl': 30 * 86400,       # 解析结果的有效期
+    'negative_ttl': 3600,    # “找不到该账号”的有效期
+}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS identifier_index (
+    platform TEXT NOT NULL,
+    alias TEXT NOT NULL,
+    canonical TEXT,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (platform, alias)
+) WITHOUT ROWID;
+'''
+
+_inflight = SingleFlight()
+
+
+class Unresolved(Exception):
+    """输入无法解析为账号，result 为返回给调用方的失败结果"""
+
+    def __init__(self, result):
+        super().__init__(result.get('message'))
+        self.result = result
+
+
+def resolver_config():
+    config = dict(DEFAULT_RESOLVER_CONFIG)
+    config.update(load_api_config().get('resolver') or {})
+    return config
+
+
+def _db():
+    storage.ensure_schema('resolver', SCHEMA)
+    return storage.connect()
+
+
+def _lookup(platform, alias):
+    row = _db().execute('SELECT canonical, expires_at FROM identifier_index WHERE platform = ? AND alias = ?',
+                        (platform, alias)).fetchone()
+    if row is None or row['expires_at'] < time.time():
+        return None
+    return row
+
+
+def _resolve_remote(platform, module, alias, config):
+    row = _lookup(platform, alias)
+    if row is not None:
+        return row['canonical']
+    # 网络错误、缺少密钥等直接抛出，不写入索引
+    canonical = module.resolve(alias)
+    ttl = config['ttl'] if canonical else config['negative_ttl']
+    _db().execute('INSERT OR REPLACE INTO identifier_index (platform, alias, canonical, expires_at) '
+                  'VALUES (?, ?, ?, ?)', (platform, alias, canonical, time.time() + ttl))
+    return canonical
+
+
+def resolve(platform, text):
+    """
+    返回规范 ID，同一账号的各种写法得到同一个结果（结果缓存、跟踪、历史都以它为键）
+    无法解析时抛出 Unresolved
+    """
+    text = (text or '').strip()
+    module = platforms.module(platform)
+    normalize = getattr(module, 'normalize', None)
+    if normalize is None:
+        return text
+    alias, canonical = normalize(text)
+    if not alias:
+        raise Unresolved(platforms.failed('无法识别的账号标识'))
+    if canonical:
+        return canonical
+
+    config = resolver_config()
+    row = _lookup(platform, alias)
+    if row is not None:
+        canonical = row['canonical']
+    else:
+        try:
+            canonical = _inflight.do((platform, alias), _resolve_remote, platform, module, alias, config)
+        except Exception as e:
+            raise Unresolved(platforms.failed(f'解析账号失败: {str(e)}'))
+    if not canonical:
+        raise Unresolved(platforms.failed('未找到该账号', not_found=True))
+    return canonical
@@ -0,0 +1,104 @@
+import gzip
+import hashlib
+import threading
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 响应压缩与条件请求
+# 动态 JSON/HTML 在 after_request 中按 Accept-Encoding 压缩；预渲染页面和静态资源的压缩结果缓存在内存里
+
+COMPRESSIBLE = {'text/html', 'application/json', 'text/css', 'application/javascript',
+                'text/javascript', 'text/plain', 'image/svg+xml'}
+MIN_SIZE = 512
+
+_encoded = {}
+_encoded_lock = threading.Lock()
+
+
+def choose_encoding():
+    accept = request.accept_encodings
+    if brotli is not None and accept['br']:
+        return 'br'
+    if accept['gzip']:
+        return 'gzip'
+    return None
+
+
+def encode(data, encoding, best=False):
+    """动态响应用较快的压缩级别，缓存的静态内容用最高级别"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if best else 5)
+    return gzip.compress(data, compresslevel=9 if best else 6)
+
+
+def compress(response):
+    """after_request 钩子：流式响应、已压缩或太小的响应不处理"""
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding()
+    data = response.get_data()
+    if encoding is None or len(data) < MIN_SIZE:
+        return response
+    response.set_data(encode(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    # 压缩后字节不同，强 ETag 降为弱 ETag
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def not_modified(etag, cache_control=None):
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    response.vary.add('Accept-Encoding')
+    if cache_control:
+        response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def conditional(response):
+    """
+    按响应内容生成弱 ETag，请求带 If-None-Match 且内容未变时返回 304
+    POST 的 /get_followers 也适用：前端自行带上次的 ETag，粉丝数没变就不重新下载和渲染
+    """
+    if response.status_code != 200:
+        return response
+    etag = hashlib.sha1(response.get_data()).hexdigest()[:20]
+    if request.if_none_match.contains_weak(etag):
+        return not_modified(etag, response.headers.get('Cache-Control'))
+    response.set_etag(etag, weak=True)
+    return response
+
+
+def send_cached(key, data, mimetype, cache_control):
+    """
+    发送内容固定的数据（预渲染页面、静态资源），压缩结果按 key 缓存，
+    ETag 取内容哈希，命中 If-None-Match 时返回 304
+    """
+    etag = hashlib.sha1(data).hexdigest()[:20]
+    if request.if_none_match.contains_weak(etag):
+        return not_modified(etag, cache_control)
+    encoding = choose_encoding() if mimetype in COMPRESSIBLE and len(data) >= MIN_SIZE else None
+    body = data
+    if encoding is not None:
+        with _encoded_lock:
+            body = _encoded.get((key, etag, encoding))
+        if body is None:
+            body = encode(data, encoding, best=True)
+            with _encoded_lock:
+                _encoded[(key, etag, encoding)] = body
+    response = Response(body, mimetype=mimetype)
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = cache_control
+    response.set_etag(etag, weak=True)
+    return response
@@ -0,0 +1,210 @@
+import json
+import threading
+import time
+
+import storage
+from logutil import get_logger
+from settings import load_api_config
+
+# 各平台结果的新鲜期（秒），可在 api_config.json 的 cache.ttl 中覆盖
+DEFAULT_TTLS = {
+    'bilibili': 300,
+    'youtube': 600,
+    'twitter': 600,
+    'telegram': 600,
+    'telegram_group': 600,
+    'xiaohongshu': 1800,
+    'douyin': 1800,
+}
+
+DEFAULT_CACHE_CONFIG = {
+    'default_ttl': 300,
+    'negative_ttl': 60,      # “用户不存在”之类结果的缓存时间
+    'stale_window': 86400,   # 过期后仍可先返回旧值、后台刷新的时长
+    'refresh_lease': 30,     # 后台刷新的租约，防止多个 worker 同时刷新
+    'max_entries': 20000,
+}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS result_cache (
+    platform TEXT NOT NULL,
+    identifier TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    stale_until REAL NOT NULL,
+    last_access REAL NOT NULL,
+    refreshing_until REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (platform, identifier)
+);
+CREATE INDEX IF NOT EXISTS result_cache_lru ON result_cache (last_access);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+'''
+
+# 命中计数先累加在进程内，定期合并写入数据库，避免每次命中都写一次
+STAT_FLUSH_INTERVAL = 5
+ACCESS_TOUCH_INTERVAL = 60
+EVICT_EVERY = 100
+
+log = get_logger('result_cache')
+
+_stats_lock = threading.Lock()
+_pending_stats = {}
+_last_flush = time.time()
+_writes_since_evict = 0
+
+
+def _config():
+    config = dict(DEFAULT_CACHE_CONFIG)
+    config.update(load_api_config().get('cache') or {})
+    return config
+
+
+def _ttl(platform, config):
+    ttls = dict(DEFAULT_TTLS)
+    ttls.update(config.get('ttl') or {})
+    return ttls.get(platform, config['default_ttl'])
+
+
+def _db():
+    storage.ensure_schema('result_cache', SCHEMA)
+    return storage.connect()
+
+
+def _count(name):
+    global _last_flush
+    with _stats_lock:
+        _pending_stats[name] = _pending_stats.get(name, 0) + 1
+        if time.time() - _last_flush < STAT_FLUSH_INTERVAL:
+            return
+        pending = dict(_pending_stats)
+        _pending_stats.clear()
+        _last_flush = time.time()
+    flush_stats(pending)
+
+
+def flush_stats(pending=None):
+    if pending is None:
+        with _stats_lock:
+            pending = dict(_pending_stats)
+            _pending_stats.clear()
+    if not pending:
+        return
+    _db().executemany(
+        'INSERT INTO cache_stats (name, value) VALUES (?, ?) '
+        'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+        list(pending.items()))
+
+
+def is_cacheable(result):
+    """成功结果和明确的“不存在”结果才缓存，超时等临时错误不缓存"""
+    return bool(result.get('success') or result.get('not_found'))
+
+
+def store(platform, identifier, result, config=None):
+    global _writes_since_evict
+    if not is_cacheable(result):
+        return
+    config = config or _config()
+    now = time.time()
+    ttl = _ttl(platform, config) if result.get('success') else config['negative_ttl']
+    _db().execute(
+        'INSERT OR REPLACE INTO result_cache '
+        '(platform, identifier, value, expires_at, stale_until, last_access, refreshing_until) '
+        'VALUES (?, ?, ?, ?, ?, ?, 0)',
+        (platform, identifier, json.dumps(result, ensure_ascii=False),
+         now + ttl, now + ttl + config['stale_window'], now))
+    _writes_since_evict += 1
+    if _writes_since_evict >= EVICT_EVERY:
+        _writes_since_evict = 0
+        evict(config['max_entries'])
+
+
+def evict(max_entries):
+    """按最近访问时间淘汰超出上限的条目"""
+    db = _db()
+    total = db.execute('SELECT COUNT(*) FROM result_cache').fetchone()[0]
+    if total > max_entries:
+        db.execute(
+            'DELETE FROM result_cache WHERE rowid IN '
+            '(SELECT rowid FROM result_cache ORDER BY last_access LIMIT ?)',
+            (total - max_entries,))
+    db.execute('DELETE FROM result_cache WHERE stale_until < ?', (time.time(),))
+
+
+def lookup(platform, identifier):
+    """只读缓存，不触发上游请求；返回 (结果, 是否新鲜)"""
+    row = _db().execute(
+        'SELECT value, expires_at, stale_until FROM result_cache '
+        'WHERE platform = ? AND identifier = ?', (platform, identifier)).fetchone()
+    if row is None or row['stale_until'] < time.time():
+        return None, False
+    return json.loads(row['value']), row['expires_at'] >= time.time()
+
+
+def _claim_refresh(platform, identifier, lease):
+    now = time.time()
+    cur = _db().execute(
+        'UPDATE result_cache SET refreshing_until = ? '
+        'WHERE platform = ? AND identifier = ? AND refreshing_until < ?',
+        (now + lease, platform, identifier, now))
+    return cur.rowcount == 1
+
+
+def _refresh(platform, identifier, fetch, config):
+    try:
+        result = fetch(platform, identifier)
+        if is_cacheable(result):
+            store(platform, identifier, result, config)
+        else:
+            # 刷新失败时继续使用旧值，租约到期后由下一次请求重试
+            _count('refresh_error')
+    except Exception as e:
+        log.warning("后台刷新失败 platform=%s identifier=%s error=%s", platform, identifier, e)
+        _count('refresh_error')
+
+
+def get_or_fetch(platform, identifier, fetch):
+    """
+    先查缓存：新鲜直接返回；过期但在 stale_window 内先返回旧值，
+    同时由抢到租约的唯一一个 worker 在后台刷新；否则同步请求上游
+    :param fetch: fetch(platform, identifier) -> 结果字典
+    """
+    config = _config()
+    db = _db()
+    now = time.time()
+    row = db.execute(
+        'SELECT value, expires_at, stale_until, last_access FROM result_cache '
+        'WHERE platform = ? AND identifier = ?', (platform, identifier)).fetchone()
+
+    if row is not None and row['stale_until'] >= now:
+        if now - row['last_access'] > ACCESS_TOUCH_INTERVAL:
+            db.execute('UPDATE result_cache SET last_access = ? WHERE platform = ? AND identifier = ?',
+                       (now, platform, identifier))
+        result = json.loads(row['value'])
+        if row['expires_at'] >= now:
+            _count('hit')
+            return result
+        _count('stale')
+        if _claim_refresh(platform, identifier, config['refresh_lease']):
+            threading.Thread(target=_refresh, args=(platform, identifier, fetch, config),
+                             daemon=True).start()
+        return result
+
+    _count('miss')
+    result = fetch(platform, identifier)
+    store(platform, identifier, result, config)
+    return result
+
+
+def get_stats():
+    flush_stats()
+    rows = _db().execute('SELECT name, value FROM cache_stats').fetchall()
+    stats = {row['name']: row['value'] for row in rows}
+    hits = stats.get('hit', 0) + stats.get('stale', 0)
+    total = hits + stats.get('miss', 0)
+    stats['entries'] = _db().execute('SELECT COUNT(*) FROM result_cache').fetchone()[0]
+    stats['hit_ratio'] = round(hits / total, 4) if total else 0
+    return stats
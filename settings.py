@@ -0,0 +1,43 @@
+import copy
+import json
+import os
+import threading
+
+# API 配置文件路径（压测等场景可用 UPMIAO_CONFIG 指定其他文件）
+CONFIG_FILE = os.environ.get('UPMIAO_CONFIG', 'api_config.json')
+
+# 配置按文件 mtime 缓存在内存中，文件未变化时不再重复读盘解析
+_cache_lock = threading.Lock()
+_cached_stamp = None
+_cached_config = None
+
+def _stamp():
+    try:
+        st = os.stat(CONFIG_FILE)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def load_api_config():
+    """加载 API 配置"""
+    global _cached_stamp, _cached_config
+    stamp = _stamp()
+    if stamp is None:
+        return {'youtube': '', 'twitter': ''}
+    with _cache_lock:
+        if stamp != _cached_stamp:
+            with open(CONFIG_FILE, 'r') as f:
+                _cached_config = json.load(f)
+            _cached_stamp = stamp
+        # 返回副本，调用方修改不会污染缓存
+        return copy.deepcopy(_cached_config)
+
+def save_api_config(config):
+    """保存 API 配置，只覆盖提交的字段，保留连接池等其他配置节"""
+    global _cached_stamp
+    merged = load_api_config()
+    merged.update(config or {})
+    with open(CONFIG_FILE, 'w') as f:
+        json.dump(merged, f)
+    with _cache_lock:
+        _cached_stamp = None
@@ -0,0 +1,66 @@
+// 检查 API 状态
+async function checkApiStatus() {
+    try {
+        const response = await fetch('/check_api_status');
+        const data = await response.json();
+
+        document.getElementById('youtubeStatus').className = 
+            `api-status ${data.youtube ? 'active' : 'inactive'}`;
+        document.getElementById('twitterStatus').className = 
+            `api-status ${data.twitter ? 'active' : 'inactive'}`;
+    } catch (error) {
+        console.error('Error checking API status:', error);
+    }
+}
+
+// 加载已保存的配置
+async function loadConfig() {
+    try {
+        const response = await fetch('/get_api_config');
+        const data = await response.json();
+
+        if (data.youtube) {
+            document.getElementById('youtubeApiKey').value = data.youtube;
+        }
+        if (data.twitter) {
+            document.getElementById('twitterApiKey').value = data.twitter;
+        }
+    } catch (error) {
+        console.error('Error loading config:', error);
+    }
+}
+
+// 保存配置
+document.getElementById('saveConfig').addEventListener('click', async () => {
+    const config = {
+        youtube: document.getElementById('youtubeApiKey').value,
+        twitter: document.getElementById('twitterApiKey').value
+    };
+
+    try {
+        const response = await fetch('/save_api_config', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(config)
+        });
+
+        const result = await response.json();
+        if (result.success) {
+            alert('配置已保存');
+            checkApiStatus();
+        } else {
+            alert('保存失败：' + result.message);
+        }
+    } catch (error) {
+        console.error('Error saving config:', error);
+        alert('保存失败，请重试');
+    }
+});
+
+// 页面加载时检查状态和加载配置
+window.addEventListener('load', () => {
+    checkApiStatus();
+    loadConfig();
+});
@@ -0,0 +1,327 @@
+let currentPlatform = 'bilibili';
+let currentIdentifier = '';
+let queryHistory = [];
+// 上次查询的 ETag 和结果，粉丝数没变时服务端返回 304，直接沿用
+const lastResponses = new Map();
+
+// 侧边栏切换
+const toggleSidebar = document.getElementById('toggleSidebar');
+const sidebar = document.querySelector('.sidebar');
+const mainContent = document.querySelector('.main-content');
+
+toggleSidebar.addEventListener('click', () => {
+    sidebar.classList.toggle('collapsed');
+    toggleSidebar.classList.toggle('collapsed');
+    mainContent.classList.toggle('expanded');
+
+    // 更新箭头方向
+    const svg = toggleSidebar.querySelector('svg');
+    if (sidebar.classList.contains('collapsed')) {
+        svg.style.transform = 'rotate(180deg)';
+    } else {
+        svg.style.transform = 'rotate(0deg)';
+    }
+});
+
+// 平台选择
+const platformButtons = document.querySelectorAll('.platform-button');
+platformButtons.forEach(button => {
+    button.addEventListener('click', () => {
+        platformButtons.forEach(btn => btn.classList.remove('active'));
+        button.classList.add('active');
+        currentPlatform = button.dataset.platform;
+
+        // 更新输入框提示
+        const placeholder = {
+            'bilibili': '请输入B站用户UID',
+            'youtube': '请输入YouTube频道ID',
+            'wechat_mp': '请输入公众号原始ID',
+            'xiaohongshu': '请输入小红书用户ID',
+            'douyin': '请输入抖音号',
+            'kuaishou': '请输入快手ID',
+            'wechat_video': '请输入视频号ID',
+            'twitter': '请输入推特用户名'
+        }[currentPlatform];
+        document.getElementById('identifier').placeholder = placeholder;
+        // 更新下方提示
+        const hint = {
+            'bilibili': 'B站：输入UID',
+            'youtube': 'YouTube：输入频道ID',
+            'wechat_mp': '公众号：输入原始ID',
+            'xiaohongshu': '小红书：输入用户ID',
+            'douyin': '抖音：输入抖音号',
+            'kuaishou': '快手：输入ID',
+            'wechat_video': '视频号：输入ID',
+            'twitter': '推特：输入用户名'
+        }[currentPlatform];
+        document.getElementById('platformHint').innerHTML = hint;
+    });
+});
+
+// 检查是否已存在相同的结果
+function isDuplicateResult(identifier, platform) {
+    return queryHistory.some(item => 
+        item.platform === platform && 
+        (item.username === identifier || item.uid === identifier)
+    );
+}
+
+// 更新现有结果
+function updateExistingResult(identifier, platform, newData) {
+    const resultsGrid = document.querySelector('.results-grid');
+    const cards = resultsGrid.getElementsByClassName('result-card');
+
+    for (let i = 0; i < cards.length; i++) {
+        const card = cards[i];
+        const cardPlatform = card.dataset.platform;
+        const cardIdentifier = card.dataset.identifier;
+
+        if (cardPlatform === platform && cardIdentifier === identifier) {
+            // 更新卡片内容
+            updateCardContent(card, newData);
+            return true;
+        }
+    }
+    return false;
+}
+
+// 只修改变化的部分，不重建整张卡片
+function updateCardContent(card, data) {
+    const count = card.querySelector('.follower-count');
+    const text = `粉丝数：${data.follower}`;
+    if (count && count.textContent !== text) {
+        count.textContent = text;
+    }
+    const name = card.querySelector('h3');
+    if (name && data.username && name.textContent !== data.username) {
+        name.textContent = data.username;
+    }
+    const avatar = card.querySelector('.avatar-img');
+    if (avatar && data.avatar && avatar.getAttribute('src') !== data.avatar) {
+        avatar.setAttribute('src', data.avatar);
+    }
+}
+
+// 订阅页面上所有卡片的实时更新，服务端只在粉丝数变化时推送
+let liveSource = null;
+function refreshLiveSubscription() {
+    if (liveSource) {
+        liveSource.close();
+        liveSource = null;
+    }
+    const cards = document.querySelectorAll('.results-grid .result-card');
+    const accounts = Array.from(cards)
+        .filter(card => card.dataset.query)
+        .map(card => encodeURIComponent(`${card.dataset.platform}:${card.dataset.query}`));
+    if (!accounts.length || !window.EventSource) {
+        return;
+    }
+    liveSource = new EventSource(`/live?accounts=${accounts.join(',')}`);
+    // 按当前页面上的卡片匹配，订阅建立后卡片增删也不会更新到已移除的节点
+    const apply = item => {
+        for (const card of document.querySelectorAll('.results-grid .result-card')) {
+            if (card.dataset.platform === item.platform && card.dataset.query === item.identifier) {
+                updateCardContent(card, item);
+            }
+        }
+    };
+    liveSource.addEventListener('snapshot', e => JSON.parse(e.data).forEach(apply));
+    liveSource.addEventListener('update', e => apply(JSON.parse(e.data)));
+}
+
+// 获取平台图标
+function getPlatformIcon(platform) {
+    return {
+        'bilibili': 'https://www.bilibili.com/favicon.ico',
+        'youtube': 'https://www.youtube.com/favicon.ico',
+        'wechat_mp': 'https://res.wx.qq.com/a/wx_fed/assets/res/NTI4MWU5.ico',
+        'xiaohongshu': 'https://www.xiaohongshu.com/favicon.ico',
+        'douyin': 'https://www.douyin.com/favicon.ico',
+        'kuaishou': 'https://www.kuaishou.com/favicon.ico',
+        'wechat_video': 'https://res.wx.qq.com/a/wx_fed/assets/res/NTI4MWU5.ico',
+        'twitter': 'https://x.com/favicon.ico'
+    }[platform];
+}
+
+// 获取平台名称
+function getPlatformName(platform) {
+    return {
+        'bilibili': 'B站',
+        'youtube': 'YouTube',
+        'wechat_mp': '公众号',
+        'xiaohongshu': '小红书',
+        'douyin': '抖音',
+        'kuaishou': '快手',
+        'wechat_video': '视频号',
+        'twitter': '推特'
+    }[platform];
+}
+
+// 创建结果卡片
+function createResultCard(data, platform, identifier) {
+    const card = document.createElement('div');
+    card.className = 'result-card slide-in';
+    card.dataset.platform = platform;
+    card.dataset.identifier = data.username;
+    card.dataset.query = identifier;
+
+    card.innerHTML = `
+        <div class="flex items-center space-x-3">
+            <div class="relative">
+                <img class="avatar-img" src="${data.avatar}" alt="用户头像" 
+                    loading="lazy" onerror="this.onerror=null; this.src='/avatar?url=https%3A%2F%2Fi0.hdslb.com%2Fbfs%2Fface%2Fmember%2Fnoface.jpg&size=128';"
+                    referrerpolicy="no-referrer">
+            </div>
+            <div class="flex-grow">
+                <div class="flex items-center mb-1">
+                    <img src="${getPlatformIcon(platform)}" alt="${getPlatformName(platform)}" class="w-4 h-4 mr-1">
+                    <h3 class="text-lg font-medium">${data.username}</h3>
+                </div>
+                <p class="follower-count">粉丝数：${data.follower}</p>
+            </div>
+        </div>
+    `;
+    return card;
+}
+
+// 显示 Toast 消息
+function showToast(message) {
+    const toast = document.getElementById('toast');
+    toast.textContent = message;
+    toast.classList.add('show');
+
+    setTimeout(() => {
+        toast.classList.remove('show');
+    }, 3000);
+}
+
+// 长轮询后台任务，结束后返回查询结果
+async function waitForJob(jobId) {
+    while (true) {
+        const response = await fetch(`/jobs/${jobId}?wait=20`);
+        const job = await response.json();
+        if (!response.ok || job.status === 'expired') {
+            return {success: false};
+        }
+        if (job.status === 'done' || job.status === 'failed') {
+            return {...job.result, identifier: job.identifier};
+        }
+    }
+}
+
+// 查询用户信息
+async function queryUserInfo(identifier) {
+    try {
+        // 检查页面上是否已存在该卡片（重复）
+        const resultDiv = document.getElementById('result');
+        const resultsGrid = resultDiv.querySelector('.results-grid');
+        let isDuplicate = false;
+        const cards = resultsGrid.getElementsByClassName('result-card');
+        for (let i = 0; i < cards.length; i++) {
+            const card = cards[i];
+            if (card.dataset.platform === currentPlatform && card.dataset.identifier === identifier) {
+                isDuplicate = true;
+                break;
+            }
+        }
+        if (isDuplicate) {
+            showToast('该用户信息已显示');
+            return;
+        }
+
+        // 不再插入加载中卡片，直接发请求
+        const cacheKey = `${currentPlatform}:${identifier}`;
+        const previous = lastResponses.get(cacheKey);
+        const headers = {
+            'Content-Type': 'application/x-www-form-urlencoded',
+        };
+        if (previous) {
+            headers['If-None-Match'] = previous.etag;
+        }
+        const response = await fetch('/get_followers', {
+            method: 'POST',
+            headers,
+            body: `platform=${encodeURIComponent(currentPlatform)}&identifier=${encodeURIComponent(identifier)}`
+        });
+        let data;
+        if (response.status === 304 && previous) {
+            data = previous.data;
+        } else {
+            data = await response.json();
+            const etag = response.headers.get('ETag');
+            if (etag && data.success) {
+                lastResponses.set(cacheKey, {etag, data});
+            }
+        }
+        // 慢平台返回 202，长轮询任务直到拿到结果
+        if (response.status === 202) {
+            data = await waitForJob(data.job_id);
+        }
+
+        if (data.success) {
+            resultDiv.classList.remove('hidden');
+            // 检查页面上是否已存在该卡片（理论上不会重复，但保险）
+            let updated = false;
+            let cardsChanged = false;
+            for (let i = 0; i < cards.length; i++) {
+                const card = cards[i];
+                if (card.dataset.platform === currentPlatform && card.dataset.identifier === data.username) {
+                    updateCardContent(card, data);
+                    updated = true;
+                    break;
+                }
+            }
+            if (!updated) {
+                // 卡片记录解析后的规范 ID，实时推送按它匹配
+                const resultCard = createResultCard(data, currentPlatform, data.identifier || identifier);
+                resultsGrid.appendChild(resultCard);
+                cardsChanged = true;
+            }
+            if (!queryHistory.some(item => item.platform === currentPlatform && item.username === data.username)) {
+                queryHistory.push({...data, platform: currentPlatform});
+                if (queryHistory.length > 9) {
+                    resultsGrid.removeChild(resultsGrid.firstElementChild);
+                    queryHistory.shift();
+                    cardsChanged = true;
+                }
+            }
+            currentIdentifier = identifier;
+            // 新增或淘汰了卡片都要按当前卡片重建 /live 订阅
+            if (cardsChanged) {
+                refreshLiveSubscription();
+            }
+        } else {
+            // 查询失败时不显示任何卡片
+            showToast('查询失败，请检查输入是否正确');
+        }
+    } catch (error) {
+        console.error('Error:', error);
+        showToast('查询失败，请稍后重试');
+    }
+}
+
+// 初始查询表单提交
+document.getElementById('followerForm').addEventListener('submit', async (e) => {
+    e.preventDefault();
+    const identifier = document.getElementById('identifier').value;
+    await queryUserInfo(identifier);
+});
+
+// 修改标识按钮点击
+document.getElementById('changeIdentifierBtn').addEventListener('click', () => {
+    document.getElementById('changeIdentifierForm').classList.remove('hidden');
+});
+
+// 确认修改
+document.getElementById('confirmChangeBtn').addEventListener('click', async () => {
+    const newIdentifier = document.getElementById('newIdentifier').value;
+    if (newIdentifier) {
+        await queryUserInfo(newIdentifier);
+        document.getElementById('changeIdentifierForm').classList.add('hidden');
+    }
+});
+
+// 取消修改
+document.getElementById('cancelChangeBtn').addEventListener('click', () => {
+    document.getElementById('changeIdentifierForm').classList.add('hidden');
+});
@@ -0,0 +1,34 @@
+import os
+import sqlite3
+import threading
+
+# 所有 gunicorn worker 共享的本地数据库（WAL 模式下读写互不阻塞）
+DB_FILE = os.environ.get('UPMIAO_DB', 'upmiao.db')
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schemas_ready = set()
+
+
+def connect():
+    """返回当前线程的数据库连接，fork 后自动重连"""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.pid == os.getpid():
+        return conn
+    conn = sqlite3.connect(DB_FILE, timeout=10, isolation_level=None, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    _local.conn = conn
+    _local.pid = os.getpid()
+    return conn
+
+
+def ensure_schema(name, script):
+    """每个进程对每份建表语句只执行一次"""
+    if name in _schemas_ready:
+        return
+    with _schema_lock:
+        if name not in _schemas_ready:
+            connect().executescript(script)
+            _schemas_ready.add(name)
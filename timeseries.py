@@ -0,0 +1,271 @@
+import atexit
+import threading
+import time
+
+import storage
+from logutil import get_logger
+from settings import load_api_config
+
+# 粉丝数时序存储
+# 原始采样按 (账号, 天) 分块，时间戳和数值都以 zigzag 差分 + varint 编码追加到 BLOB，
+# 写入时同步更新小时、天两级汇总（min/max/last），旧的原始数据按保留期删除，只留汇总
+
+HOUR = 3600
+DAY = 86400
+
+log = get_logger('timeseries')
+
+DEFAULT_TIMESERIES_CONFIG = {
+    'raw_days': 30,        # 原始采样保留天数
+    'hourly_days': 400,    # 小时汇总保留天数，天汇总永久保留
+    'flush_size': 500,     # 缓冲达到该条数立即写库
+    'flush_interval': 2.0, # 否则按该周期定时写库
+}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS ts_series (
+    id INTEGER PRIMARY KEY,
+    platform TEXT NOT NULL,
+    identifier TEXT NOT NULL,
+    UNIQUE (platform, identifier)
+);
+CREATE TABLE IF NOT EXISTS ts_chunk (
+    series_id INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    last_ts INTEGER NOT NULL,
+    last_value INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (series_id, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ts_rollup (
+    series_id INTEGER NOT NULL,
+    resolution INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    min INTEGER NOT NULL,
+    max INTEGER NOT NULL,
+    last INTEGER NOT NULL,
+    last_ts INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (series_id, resolution, bucket)
+) WITHOUT ROWID;
+'''
+
+ROLLUP_UPSERT = '''
+INSERT INTO ts_rollup (series_id, resolution, bucket, min, max, last, last_ts, count)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(series_id, resolution, bucket) DO UPDATE SET
+    min = MIN(min, excluded.min),
+    max = MAX(max, excluded.max),
+    last = CASE WHEN excluded.last_ts >= last_ts THEN excluded.last ELSE last END,
+    last_ts = MAX(last_ts, excluded.last_ts),
+    count = count + excluded.count
+'''
+
+
+def _db():
+    storage.ensure_schema('timeseries', SCHEMA)
+    return storage.connect()
+
+
+def timeseries_config():
+    config = dict(DEFAULT_TIMESERIES_CONFIG)
+    config.update(load_api_config().get('timeseries') or {})
+    return config
+
+
+def encode_varint(n, out):
+    """zigzag + LEB128，正负差值都只占很少的字节"""
+    n = (n << 1) ^ (n >> 63)
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def decode_varints(data):
+    values = []
+    n = shift = 0
+    for byte in data:
+        n |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        values.append((n >> 1) ^ -(n & 1))
+        n = shift = 0
+    return values
+
+
+def decode_chunk(day, data):
+    """块内第一条相对当天零点和 0 编码，其余相对上一条"""
+    values = decode_varints(data)
+    samples = []
+    ts, value = day * DAY, 0
+    for i in range(0, len(values) - 1, 2):
+        ts += values[i]
+        value += values[i + 1]
+        samples.append((ts, value))
+    return samples
+
+
+class Writer:
+    """攒批写入，轮询器高频采样时每次只是追加到内存列表"""
+
+    def __init__(self):
+        self.config = timeseries_config()
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._series_ids = {}
+        self._thread = None
+        self._last_retention = 0
+
+    def append(self, platform, identifier, ts, value):
+        with self._lock:
+            self._buffer.append((platform, identifier, int(ts), int(value)))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='timeseries', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+            full = len(self._buffer) >= self.config['flush_size']
+        if full:
+            self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.config['flush_interval'])
+            self._wakeup.clear()
+            try:
+                self.flush()
+                if time.time() - self._last_retention > HOUR:
+                    self._last_retention = time.time()
+                    apply_retention(self.config)
+            except Exception:
+                log.exception("写入粉丝数时序失败")
+
+    def _series_id(self, db, platform, identifier):
+        key = (platform, identifier)
+        series_id = self._series_ids.get(key)
+        if series_id is None:
+            db.execute('INSERT OR IGNORE INTO ts_series (platform, identifier) VALUES (?, ?)', key)
+            series_id = db.execute('SELECT id FROM ts_series WHERE platform = ? AND identifier = ?',
+                                   key).fetchone()[0]
+            self._series_ids[key] = series_id
+        return series_id
+
+    def flush(self):
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+        db = _db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            chunks = {}
+            rollups = {}
+            for platform, identifier, ts, value in sorted(batch, key=lambda s: s[2]):
+                series_id = self._series_id(db, platform, identifier)
+                chunks.setdefault((series_id, ts // DAY), []).append((ts, value))
+                for resolution in (HOUR, DAY):
+                    key = (series_id, resolution, ts - ts % resolution)
+                    agg = rollups.get(key)
+                    if agg is None:
+                        rollups[key] = [value, value, value, ts, 1]
+                    else:
+                        agg[0] = min(agg[0], value)
+                        agg[1] = max(agg[1], value)
+                        if ts >= agg[3]:
+                            agg[2], agg[3] = value, ts
+                        agg[4] += 1
+            for (series_id, day), samples in chunks.items():
+                self._append_chunk(db, series_id, day, samples)
+            db.executemany(ROLLUP_UPSERT, [key + tuple(agg) for key, agg in rollups.items()])
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+
+    def _append_chunk(self, db, series_id, day, samples):
+        row = db.execute('SELECT count, last_ts, last_value, data FROM ts_chunk '
+                         'WHERE series_id = ? AND day = ?', (series_id, day)).fetchone()
+        if row is None:
+            count, last_ts, last_value, data = 0, day * DAY, 0, bytearray()
+        else:
+            count, last_ts, last_value, data = row[0], row[1], row[2], bytearray(row[3])
+        for ts, value in samples:
+            if ts < last_ts:
+                # 块内只允许追加，迟到的乱序采样只进汇总
+                continue
+            encode_varint(ts - last_ts, data)
+            encode_varint(value - last_value, data)
+            last_ts, last_value = ts, value
+            count += 1
+        db.execute('INSERT OR REPLACE INTO ts_chunk (series_id, day, count, last_ts, last_value, data) '
+                   'VALUES (?, ?, ?, ?, ?, ?)',
+                   (series_id, day, count, last_ts, last_value, bytes(data)))
+
+
+def apply_retention(config=None):
+    """删除超过保留期的原始块和小时汇总，降采样为更粗的粒度"""
+    config = config or timeseries_config()
+    now = int(time.time())
+    db = _db()
+    db.execute('DELETE FROM ts_chunk WHERE day < ?', ((now - config['raw_days'] * DAY) // DAY,))
+    db.execute('DELETE FROM ts_rollup WHERE resolution = ? AND bucket < ?',
+               (HOUR, now - config['hourly_days'] * DAY))
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = Writer()
+        return _writer
+
+
+def append(platform, identifier, value, ts=None):
+    get_writer().append(platform, identifier, ts if ts is not None else time.time(), value)
+
+
+def pick_resolution(start, end):
+    span = end - start
+    if span <= 2 * DAY:
+        return 'raw'
+    if span <= 90 * DAY:
+        return 'hour'
+    return 'day'
+
+
+def query(platform, identifier, start, end, resolution='auto'):
+    """
+    区间查询
+    raw 返回 [[ts, follower], ...]，hour/day 返回 [[bucket, min, max, last], ...]
+    """
+    if resolution == 'auto':
+        resolution = pick_resolution(start, end)
+    db = _db()
+    row = db.execute('SELECT id FROM ts_series WHERE platform = ? AND identifier = ?',
+                     (platform, identifier)).fetchone()
+    if row is None:
+        return resolution, []
+    series_id = row[0]
+    if resolution == 'raw':
+        points = []
+        for chunk in db.execute('SELECT day, data FROM ts_chunk WHERE series_id = ? AND day BETWEEN ? AND ? '
+                                'ORDER BY day', (series_id, int(start) // DAY, int(end) // DAY)):
+            points.extend([ts, value] for ts, value in decode_chunk(chunk[0], chunk[1])
+                          if start <= ts <= end)
+        return resolution, points
+    step = HOUR if resolution == 'hour' else DAY
+    rows = db.execute('SELECT bucket, min, max, last FROM ts_rollup '
+                      'WHERE series_id = ? AND resolution = ? AND bucket BETWEEN ? AND ? ORDER BY bucket',
+                      (series_id, step, int(start) - int(start) % step, int(end)))
+    return resolution, [list(r) for r in rows]
@@ -0,0 +1,332 @@
+import fcntl
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import storage
+from logutil import get_logger
+from settings import load_api_config
+
+# 每个平台的令牌桶预算：(每秒补充的令牌数, 桶容量)
+# 抓 HTML 的小红书、Telegram 要温和，B站 card 接口可以快一些
+DEFAULT_BUDGETS = {
+    'bilibili': (2.0, 10),
+    'youtube': (1.0, 5),
+    'twitter': (0.2, 2),
+    'telegram': (0.2, 2),
+    'telegram_group': (0.2, 2),
+    'xiaohongshu': (0.05, 1),
+    'douyin': (0.05, 1),
+}
+DEFAULT_SCHEDULER_CONFIG = {
+    'enabled': True,
+    'default_interval': 600,   # 新加入账号的轮询间隔（秒）
+    'min_interval': 60,
+    'max_interval': 6 * 3600,
+    'tick': 1.0,               # 调度循环的检查周期
+    'batch_size': 50,          # 每轮最多取出的到期账号数
+    'workers': 4,
+}
+
+LOCK_FILE = 'upmiao.scheduler.lock'
+LEASE_EXPIRE_INTERVAL = 30
+
+log = get_logger('tracker')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS tracked (
+    platform TEXT NOT NULL,
+    identifier TEXT NOT NULL,
+    base_interval REAL NOT NULL,
+    interval REAL NOT NULL,
+    next_due REAL NOT NULL,
+    last_value TEXT,
+    last_follower REAL,
+    last_fetched REAL,
+    added_at REAL NOT NULL,
+    PRIMARY KEY (platform, identifier)
+);
+CREATE INDEX IF NOT EXISTS tracked_due ON tracked (next_due);
+CREATE INDEX IF NOT EXISTS tracked_platform_due ON tracked (platform, next_due);
+CREATE TABLE IF NOT EXISTS tracked_lease (
+    platform TEXT NOT NULL,
+    identifier TEXT NOT NULL,
+    lease_until REAL NOT NULL,
+    PRIMARY KEY (platform, identifier)
+) WITHOUT ROWID;
+'''
+
+
+def _db():
+    storage.ensure_schema('tracked', SCHEMA)
+    return storage.connect()
+
+
+def scheduler_config():
+    config = dict(DEFAULT_SCHEDULER_CONFIG)
+    config.update(load_api_config().get('scheduler') or {})
+    budgets = dict(DEFAULT_BUDGETS)
+    budgets.update({k: tuple(v) for k, v in (config.get('budgets') or {}).items()})
+    config['budgets'] = budgets
+    return config
+
+
+def as_number(value):
+    """把粉丝数转换成数字，无法解析时返回 None"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def add(platform, identifier, interval=None):
+    config = scheduler_config()
+    interval = max(config['min_interval'], float(interval or config['default_interval']))
+    now = time.time()
+    # 首次到期时间在一个间隔内随机分布，避免一起加入的账号同时请求上游
+    _db().execute(
+        'INSERT INTO tracked (platform, identifier, base_interval, interval, next_due, added_at) '
+        'VALUES (?, ?, ?, ?, ?, ?) '
+        'ON CONFLICT(platform, identifier) DO UPDATE SET '
+        'base_interval = excluded.base_interval, interval = excluded.interval',
+        (platform, identifier, interval, interval, now + random.uniform(0, interval), now))
+    # 手动加入的账号转为长期跟踪
+    _db().execute('DELETE FROM tracked_lease WHERE platform = ? AND identifier = ?', (platform, identifier))
+
+
+def lease(platform, identifier, interval, seconds, limit):
+    """
+    临时跟踪（实时推送的订阅）：未跟踪的账号加入轮询并记录租约，租约到期后移出；
+    手动跟踪的账号不受影响。临时跟踪的账号数达到 limit 时不再加入，返回 False
+    """
+    db = _db()
+    key = (platform, identifier)
+    if db.execute('SELECT 1 FROM tracked WHERE platform = ? AND identifier = ?', key).fetchone() is not None:
+        # 已租约的续期，手动跟踪的（没有租约）保持不变
+        db.execute('UPDATE tracked_lease SET lease_until = MAX(lease_until, ?) '
+                   'WHERE platform = ? AND identifier = ?', (time.time() + seconds, *key))
+        return True
+    if db.execute('SELECT COUNT(*) FROM tracked_lease').fetchone()[0] >= limit:
+        return False
+    add(platform, identifier, interval)
+    db.execute('INSERT OR REPLACE INTO tracked_lease (platform, identifier, lease_until) VALUES (?, ?, ?)',
+               (*key, time.time() + seconds))
+    return True
+
+
+def renew_leases(keys, seconds):
+    _db().executemany('UPDATE tracked_lease SET lease_until = ? WHERE platform = ? AND identifier = ?',
+                      [(time.time() + seconds, platform, identifier) for platform, identifier in keys])
+
+
+def expire_leases():
+    """移出租约已到期（没有客户端再订阅）的临时跟踪账号"""
+    db = _db()
+    now = time.time()
+    db.execute('DELETE FROM tracked WHERE (platform, identifier) IN '
+               '(SELECT platform, identifier FROM tracked_lease WHERE lease_until < ?)', (now,))
+    cur = db.execute('DELETE FROM tracked_lease WHERE lease_until < ?', (now,))
+    if cur.rowcount:
+        log.info("临时跟踪到期 count=%s", cur.rowcount)
+
+
+def changed_since(since):
+    """返回 last_fetched 晚于 since 的账号及其最新采样"""
+    rows = _db().execute(
+        'SELECT platform, identifier, last_value, last_fetched FROM tracked '
+        'WHERE last_fetched > ?', (since,)).fetchall()
+    return [(row['platform'], row['identifier'], json.loads(row['last_value']), row['last_fetched'])
+            for row in rows if row['last_value']]
+
+
+def remove(platform, identifier):
+    db = _db()
+    db.execute('DELETE FROM tracked_lease WHERE platform = ? AND identifier = ?', (platform, identifier))
+    cur = db.execute('DELETE FROM tracked WHERE platform = ? AND identifier = ?', (platform, identifier))
+    return cur.rowcount > 0
+
+
+def list_tracked():
+    rows = _db().execute(
+        'SELECT platform, identifier, base_interval, interval, next_due, last_fetched, last_value '
+        'FROM tracked ORDER BY platform, identifier').fetchall()
+    tracked = []
+    for row in rows:
+        item = dict(row)
+        item['last_value'] = json.loads(item['last_value']) if item['last_value'] else None
+        tracked.append(item)
+    return tracked
+
+
+def latest(platform, identifier):
+    """已跟踪账号最近一次成功的采样，没有时返回 None"""
+    row = _db().execute(
+        'SELECT last_value FROM tracked WHERE platform = ? AND identifier = ?',
+        (platform, identifier)).fetchone()
+    if row is None or not row['last_value']:
+        return None
+    return json.loads(row['last_value'])
+
+
+def next_interval(row, follower, config):
+    """
+    数值有变化的账号缩短间隔，长时间不变的逐步放宽，
+    波动大的账号因此会被更频繁地轮询
+    """
+    interval = row['interval']
+    previous = row['last_follower']
+    if follower is None or previous is None:
+        interval = row['base_interval']
+    elif follower != previous:
+        interval = interval / 2
+    else:
+        interval = interval * 1.5
+    upper = min(config['max_interval'], row['base_interval'] * 4)
+    return min(max(interval, config['min_interval']), upper)
+
+
+def record(platform, identifier, result, config):
+    """写入一次采样结果并安排下一次轮询"""
+    db = _db()
+    row = db.execute('SELECT * FROM tracked WHERE platform = ? AND identifier = ?',
+                     (platform, identifier)).fetchone()
+    if row is None:
+        return
+    now = time.time()
+    if result.get('success'):
+        follower = as_number(result.get('follower'))
+        interval = next_interval(row, follower, config)
+        db.execute(
+            'UPDATE tracked SET interval = ?, next_due = ?, last_value = ?, last_follower = ?, '
+            'last_fetched = ? WHERE platform = ? AND identifier = ?',
+            (interval, now + interval * random.uniform(0.9, 1.1),
+             json.dumps(result, ensure_ascii=False), follower, now, platform, identifier))
+    else:
+        # 失败时保留上一次的数据，按基础间隔重试
+        db.execute('UPDATE tracked SET next_due = ? WHERE platform = ? AND identifier = ?',
+                   (now + row['base_interval'] * random.uniform(0.9, 1.1), platform, identifier))
+
+
+class TokenBucket:
+    """令牌桶限速"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class Scheduler:
+    """
+    后台轮询已跟踪的账号
+    多个 gunicorn worker 通过文件锁选出唯一一个运行调度循环
+    """
+
+    def __init__(self, fetch, on_sample=None):
+        self.fetch = fetch
+        self.on_sample = on_sample
+        self.config = scheduler_config()
+        self.buckets = {}
+        self.executor = ThreadPoolExecutor(max_workers=self.config['workers'],
+                                           thread_name_prefix='scheduler')
+        self._running = set()
+        self._running_lock = threading.Lock()
+        self._lock_file = None
+
+    def _bucket(self, platform):
+        bucket = self.buckets.get(platform)
+        if bucket is None:
+            rate, capacity = self.config['budgets'].get(platform, (0.5, 2))
+            bucket = self.buckets[platform] = TokenBucket(rate, capacity)
+        return bucket
+
+    def _try_lock(self):
+        lock_file = open(LOCK_FILE, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _poll(self, platform, identifier):
+        try:
+            result = self.fetch(platform, identifier)
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        try:
+            record(platform, identifier, result, self.config)
+            if self.on_sample is not None:
+                self.on_sample(platform, identifier, result)
+        finally:
+            with self._running_lock:
+                self._running.discard((platform, identifier))
+
+    def tick(self):
+        # 按平台分别取到期账号：预算用完的平台不占用其他平台的名额，
+        # 否则某个慢平台积压超过 batch_size 时，其余平台会一直排不上
+        now = time.time()
+        db = _db()
+        platforms = [row['platform'] for row in db.execute(
+            'SELECT DISTINCT platform FROM tracked WHERE next_due <= ?', (now,)).fetchall()]
+        random.shuffle(platforms)
+        remaining = self.config['batch_size']
+        for platform in platforms:
+            if remaining <= 0:
+                break
+            bucket = self._bucket(platform)
+            rows = db.execute(
+                'SELECT identifier FROM tracked WHERE platform = ? AND next_due <= ? '
+                'ORDER BY next_due LIMIT ?', (platform, now, remaining)).fetchall()
+            for row in rows:
+                key = (platform, row['identifier'])
+                with self._running_lock:
+                    if key in self._running:
+                        continue
+                # 平台预算用完时留到下一轮，同一平台的到期账号按 next_due 先后排队
+                if not bucket.try_acquire():
+                    break
+                with self._running_lock:
+                    self._running.add(key)
+                self.executor.submit(self._poll, *key)
+                remaining -= 1
+
+    def run(self):
+        while not self._try_lock():
+            time.sleep(30)
+        log.info("轮询调度已启动 pid=%s", os.getpid())
+        last_expire = 0
+        while True:
+            try:
+                self.tick()
+                if time.time() - last_expire >= LEASE_EXPIRE_INTERVAL:
+                    last_expire = time.time()
+                    expire_leases()
+            except Exception:
+                log.exception("轮询调度出错")
+            time.sleep(self.config['tick'])
+
+
+def start_scheduler(fetch, on_sample=None):
+    """启动后台调度线程；未抢到锁的进程会定期重试，接替退出的调度进程"""
+    if not scheduler_config()['enabled']:
+        return None
+    scheduler = Scheduler(fetch, on_sample)
+    threading.Thread(target=scheduler.run, name='scheduler', daemon=True).start()
+    return scheduler